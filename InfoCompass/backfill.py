@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass 历史回填工具
+按消息ID区间并发获取频道的历史消息，支持中断后继续
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import aiofiles
+from telethon import errors
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import InfoCompass
+from log_setup import channel_context
+from message_record import MessageRecord
+from message_store import MessageStore
+
+logger = logging.getLogger(__name__)
+
+# 每获取多少条消息写入一次存储并保存进度
+FLUSH_EVERY = 100
+
+
+class Backfiller:
+    """频道历史回填器"""
+
+    def __init__(self, compass: InfoCompass, store: MessageStore, ranges: int = 8,
+                 concurrency: int = 3, use_takeout: bool = False):
+        """
+        初始化回填器
+
+        Args:
+            compass: InfoCompass实例
+            store: 消息存储
+            ranges: 将消息ID空间划分的区间数
+            concurrency: 同时获取的区间数
+            use_takeout: 是否使用Telegram的数据导出 (takeout) 会话
+        """
+        self.compass = compass
+        self.store = store
+        self.ranges = ranges
+        self.use_takeout = use_takeout
+        self.state_dir = os.path.join(compass.data_dir, 'backfill')
+        os.makedirs(self.state_dir, exist_ok=True)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._state_lock = asyncio.Lock()
+
+    def _state_path(self, channel_name: str) -> str:
+        return os.path.join(self.state_dir, f"{channel_name}.json")
+
+    async def _load_state(self, channel_name: str) -> Optional[Dict]:
+        path = self._state_path(channel_name)
+        if not os.path.exists(path):
+            return None
+        async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+            return json.loads(await f.read())
+
+    async def _save_state(self, channel_name: str, state: Dict):
+        """原子地保存回填进度"""
+        async with self._state_lock:
+            path = self._state_path(channel_name)
+            tmp_path = path + '.tmp'
+            async with aiofiles.open(tmp_path, 'w', encoding='utf-8') as f:
+                await f.write(json.dumps(state, ensure_ascii=False, indent=2))
+            os.replace(tmp_path, path)
+
+    async def _id_bounds(self, client, channel, days_back: Optional[int], min_id: int):
+        """
+        计算回填的消息ID范围
+
+        Returns:
+            (下界, 上界)，回填 (下界, 上界] 之间的消息
+        """
+        latest = await client.get_messages(channel, limit=1)
+        top_id = latest[0].id if latest else 0
+
+        if days_back:
+            since_date = datetime.now(timezone.utc) - timedelta(days=days_back)
+            # 早于起始时间的最新一条消息即为下界
+            older = await client.get_messages(channel, limit=1, offset_date=since_date)
+            if older:
+                min_id = max(min_id, older[0].id)
+
+        return min_id, top_id
+
+    def _split(self, low: int, high: int) -> List[Dict]:
+        """将 (low, high] 划分为若干区间，cursor 为下一次获取的上界 (不含)"""
+        span = high - low
+        count = max(1, min(self.ranges, span))
+        step = -(-span // count)
+        ranges = []
+        for lo in range(low, high, step):
+            hi = min(lo + step, high)
+            ranges.append({'min_id': lo, 'max_id': hi, 'cursor': hi + 1, 'fetched': 0, 'done': False})
+        return ranges
+
+    @staticmethod
+    def _missing(low: int, high: int, covered_low: int, covered_high: int) -> List[tuple]:
+        """(low, high] 中不在已回填范围 (covered_low, covered_high] 内的部分"""
+        gaps = []
+        if low < covered_low:
+            gaps.append((low, min(high, covered_low)))
+        if high > covered_high:
+            gaps.append((max(low, covered_high), high))
+        return [(lo, hi) for lo, hi in gaps if hi > lo]
+
+    async def _fetch_range(self, client, channel, channel_name: str, state: Dict, id_range: Dict):
+        """获取单个区间的消息，遇到限流时等待后从进度位置继续"""
+        async with self._semaphore:
+            # 内存中的进度，只有消息写入存储后才同步到 id_range 并保存，
+            # 避免其他区间保存状态时记录下尚未写入的进度
+            cursor = id_range['cursor']
+            while not id_range['done']:
+                buffer = []
+                try:
+                    async for message in client.iter_messages(
+                        channel,
+                        min_id=id_range['min_id'],
+                        max_id=cursor,
+                        wait_time=1
+                    ):
+                        if message.message:
+                            buffer.append(self.compass._build_message_record(message))
+                        cursor = message.id
+                        if len(buffer) >= FLUSH_EVERY:
+                            await self._flush(channel_name, state, id_range, buffer, cursor)
+                            buffer = []
+                    id_range['done'] = True
+                except errors.FloodWaitError as e:
+                    logger.warning(f"区间 {id_range['min_id']}-{id_range['max_id']} 触发限流，等待 {e.seconds} 秒")
+                    await self._flush(channel_name, state, id_range, buffer, cursor)
+                    await asyncio.sleep(e.seconds)
+                    continue
+
+                await self._flush(channel_name, state, id_range, buffer, cursor)
+
+            logger.info(f"区间 {id_range['min_id']}-{id_range['max_id']} 完成，共 {id_range['fetched']} 条消息")
+
+    async def _flush(self, channel_name: str, state: Dict, id_range: Dict,
+                     buffer: List[MessageRecord], cursor: int):
+        """先写入消息再更新并保存进度，中断时最多重复获取一批，读取时会去重"""
+        await self.store.append(channel_name, buffer)
+        id_range['cursor'] = cursor
+        id_range['fetched'] += len(buffer)
+        await self._save_state(channel_name, state)
+
+    async def _new_state(self, channel_username: str, channel, days_back: Optional[int],
+                         min_id: int, previous: Optional[Dict] = None) -> Dict:
+        """
+        创建新的回填进度
+
+        上次回填已全部完成时只获取其范围之外的部分，例如之后发布的新消息
+        或 -d/--min-id 扩大后更早的消息。
+        """
+        low, high = await self._id_bounds(self.compass.telegram_client, channel, days_back, min_id)
+        gaps = [(low, high)] if high > low else []
+        covered = (low, high)
+
+        if previous and previous['ranges']:
+            covered_low = previous.get('low', min(r['min_id'] for r in previous['ranges']))
+            covered_high = previous.get('high', max(r['max_id'] for r in previous['ranges']))
+            gaps = self._missing(low, high, covered_low, covered_high)
+            if low <= covered_high and high >= covered_low:
+                covered = (min(low, covered_low), max(high, covered_high))
+            if gaps:
+                logger.info(f"上次回填已完成，继续获取范围之外的消息: {gaps}")
+            else:
+                logger.info("上次回填已覆盖请求的范围，没有需要获取的消息")
+
+        return {
+            'channel': channel_username,
+            'created_at': datetime.now().isoformat(),
+            'low': covered[0],
+            'high': covered[1],
+            'ranges': [r for lo, hi in gaps for r in self._split(lo, hi)]
+        }
+
+    @channel_context
+    async def backfill(self, channel_username: str, days_back: Optional[int] = None,
+                       min_id: int = 0, restart: bool = False) -> int:
+        """
+        回填频道历史消息
+
+        Args:
+            channel_username: 频道用户名
+            days_back: 回填多少天内的消息，为空时回填全部历史
+            min_id: 只回填ID大于该值的消息
+            restart: 忽略已保存的进度，重新开始
+
+        Returns:
+            本次回填获取的消息数量
+        """
+        channel_name = channel_username.replace('@', '').replace('/', '_')
+        await self.compass.connect()
+        channel = await self.compass.telegram_client.get_entity(channel_username)
+
+        state = None if restart else await self._load_state(channel_name)
+        if state and not all(r['done'] for r in state['ranges']):
+            logger.info(f"继续未完成的回填: {channel_username}")
+        else:
+            state = await self._new_state(channel_username, channel, days_back, min_id, state)
+            await self._save_state(channel_name, state)
+
+        pending = [r for r in state['ranges'] if not r['done']]
+        fetched_before = sum(r['fetched'] for r in state['ranges'])
+        logger.info(f"开始回填 {channel_username}: {len(pending)}/{len(state['ranges'])} 个区间待获取")
+
+        if self.use_takeout:
+            try:
+                async with self.compass.telegram_client.takeout(channels=True) as takeout:
+                    await self._run_ranges(takeout, channel, channel_name, state, pending)
+            except errors.TakeoutInitDelayError as e:
+                logger.warning(f"Telegram要求等待 {e.seconds} 秒后才能使用导出会话，改用普通会话")
+                await self._run_ranges(self.compass.telegram_client, channel, channel_name, state, pending)
+        else:
+            await self._run_ranges(self.compass.telegram_client, channel, channel_name, state, pending)
+
+        return sum(r['fetched'] for r in state['ranges']) - fetched_before
+
+    async def _run_ranges(self, client, channel, channel_name: str, state: Dict, pending: List[Dict]):
+        await asyncio.gather(*(
+            self._fetch_range(client, channel, channel_name, state, id_range)
+            for id_range in pending
+        ))
+
+
+async def run_backfill():
+    """运行回填命令"""
+    parser = argparse.ArgumentParser(
+        description="InfoCompass - 并发回填Telegram频道历史消息",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  python backfill.py @channelname -d 90
+  python backfill.py @channelname --ranges 16 --concurrency 4 --takeout
+        """
+    )
+    parser.add_argument('channels', nargs='*', help='频道用户名，省略时回填.env中配置的所有频道')
+    parser.add_argument('-d', '--days', type=int, help='回填多少天内的消息 (默认: 全部历史)')
+    parser.add_argument('--min-id', type=int, default=0, help='只回填ID大于该值的消息')
+    parser.add_argument('--ranges', type=int, default=8, help='消息ID区间数 (默认: 8)')
+    parser.add_argument('--concurrency', type=int, default=3, help='并发获取的区间数 (默认: 3)')
+    parser.add_argument('--takeout', action='store_true', help='使用Telegram数据导出会话，限流更宽松')
+    parser.add_argument('--restart', action='store_true', help='忽略已保存的进度，重新开始')
+    args = parser.parse_args()
+
+    compass = InfoCompass()
+    channels = [ch if ch.startswith('@') else '@' + ch for ch in args.channels] or compass.channels
+    if not channels:
+        print("❌ 请指定频道名称或在.env文件中配置 TELEGRAM_CHANNELS")
+        return
+
+    backfiller = Backfiller(
+        compass,
+        MessageStore(compass.data_dir),
+        ranges=args.ranges,
+        concurrency=args.concurrency,
+        use_takeout=args.takeout
+    )
+
+    print("🧭 InfoCompass 历史回填")
+    print("="*50)
+    try:
+        for channel in channels:
+            print(f"📜 正在回填频道 {channel} ...")
+            try:
+                count = await backfiller.backfill(channel, args.days, args.min_id, args.restart)
+                print(f"✅ 频道 {channel} 回填完成，新增 {count} 条消息")
+            except Exception as e:
+                logger.error(f"回填频道 {channel} 时发生错误: {str(e)}")
+                print(f"❌ 频道 {channel} 回填失败: {str(e)}，再次运行可从中断处继续")
+    finally:
+        if compass.telegram_client.is_connected():
+            await compass.telegram_client.disconnect()
+
+
+def main():
+    """主函数"""
+    try:
+        asyncio.run(run_backfill())
+    except KeyboardInterrupt:
+        print("\n\n👋 用户取消操作，再次运行可从中断处继续")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass 内存基准
+比较10万条消息使用字典和 MessageRecord 表示时的内存占用
+"""
+
+import argparse
+import json
+import random
+import sys
+import os
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from message_record import MessageRecord, iter_json_array
+
+
+def make_fixture(count: int):
+    """生成消息字段，模拟频道消息的长度分布"""
+    rng = random.Random(0)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    words = ['比特币', '价格', '发布', '更新', 'Telegram', '频道', '新闻', 'AI', '模型', '市场']
+    for i in range(count):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(10, 80)))
+        yield i, start + timedelta(minutes=i), text, rng.randint(0, 50000), rng.randint(0, 500), rng.randint(0, 50)
+
+
+def build_dicts(count: int):
+    return [
+        {
+            'id': msg_id,
+            'date': date.isoformat(),
+            'text': text,
+            'views': views,
+            'forwards': forwards,
+            'replies': replies,
+            'has_media': False,
+            'media_type': None
+        }
+        for msg_id, date, text, views, forwards, replies in make_fixture(count)
+    ]
+
+
+def build_records(count: int):
+    return [
+        MessageRecord(msg_id, date, text, views, forwards, replies)
+        for msg_id, date, text, views, forwards, replies in make_fixture(count)
+    ]
+
+
+def measure(label: str, func):
+    """测量函数执行后存活的内存和执行期间的峰值内存"""
+    tracemalloc.start()
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28}存活 {current / 1024 / 1024:8.1f} MB   峰值 {peak / 1024 / 1024:8.1f} MB")
+    return result
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="InfoCompass 消息表示内存基准")
+    parser.add_argument('-n', '--count', type=int, default=100000, help='消息数量 (默认: 100000)')
+    args = parser.parse_args()
+
+    print(f"消息数量: {args.count}")
+    print("-" * 60)
+    dicts = measure("字典 (构建)", lambda: build_dicts(args.count))
+    measure("字典 (json.dumps 导出)", lambda dicts=dicts: len(json.dumps(dicts, ensure_ascii=False, indent=2)))
+    del dicts
+
+    records = measure("MessageRecord (构建)", lambda: build_records(args.count))
+    measure("MessageRecord (分批导出)", lambda: sum(len(chunk) for chunk in iter_json_array(records)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass 频道配置
+从 channels.json 读取每个频道的获取参数、提示词和优先级
+"""
+
+import os
+import logging
+from dataclasses import dataclass, fields
+from typing import Dict, Optional
+
+import json5
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChannelConfig:
+    """单个频道的配置，未设置的字段使用本次运行的参数"""
+    limit: Optional[int] = None
+    days_back: Optional[int] = None
+    prompt: Optional[str] = None
+    priority: int = 0
+    model_tier: Optional[str] = None
+    # 期望的总结输出长度 (token)，参与模型档位选择
+    max_output_tokens: Optional[int] = None
+    # 自适应调度的轮询间隔范围 (分钟)
+    min_interval: Optional[float] = None
+    max_interval: Optional[float] = None
+
+
+def load_channel_configs(path: str) -> Dict[str, ChannelConfig]:
+    """
+    读取频道配置文件
+
+    文件格式 (JSON5，支持注释):
+        {
+          "@tech_news": {"limit": 500, "days_back": 1, "priority": 2, "prompt": "重点关注产品发布"},
+          "@weekly_digest": {"limit": 50, "days_back": 7, "priority": -1}
+        }
+
+    Returns:
+        {频道用户名: 频道配置}，文件不存在时返回空字典
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json5.load(f)
+
+    known = {field.name for field in fields(ChannelConfig)}
+    configs = {}
+    for channel, options in data.items():
+        channel = channel.strip()
+        if not channel.startswith('@'):
+            channel = '@' + channel
+        unknown = set(options) - known
+        if unknown:
+            logger.warning(f"频道 {channel} 的配置包含未知字段: {', '.join(sorted(unknown))}")
+        configs[channel] = ChannelConfig(**{key: value for key, value in options.items() if key in known})
+
+    logger.info(f"已从 {path} 读取 {len(configs)} 个频道配置")
+    return configs
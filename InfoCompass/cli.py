@@ -9,11 +9,22 @@ import argparse
 import asyncio
 import sys
 import os
+from datetime import datetime
 
 # 添加当前目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from main import InfoCompass
+from log_setup import set_console_logging
+from progress import ProgressTable
+
+
+def parse_datetime(value: str) -> datetime:
+    """解析命令行中的时间，未指定时区时按本地时间处理"""
+    try:
+        return datetime.fromisoformat(value).astimezone()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的时间格式: {value}，示例: 2025-06-01 或 2025-06-01T08:00")
 
 
 async def run_cli():
@@ -26,6 +37,7 @@ async def run_cli():
   python cli.py @channelname
   python cli.py @channelname -l 50 -d 3
   python cli.py @channelname --limit 200 --days 7 --prompt "请重点关注技术相关内容"
+  python cli.py @channelname --since 2025-06-01 --until 2025-06-08 -l 5000
 
 获取API凭据:
   Telegram: https://my.telegram.org/apps
@@ -42,14 +54,26 @@ async def run_cli():
         '-l', '--limit',
         type=int,
         default=100,
-        help='获取消息数量限制 (默认: 100)'
+        help='获取消息数量上限，仅作为安全限制 (默认: 100)'
     )
     
     parser.add_argument(
         '-d', '--days',
         type=int,
         default=1,
-        help='获取多少天前的消息 (默认: 1)'    )
+        help='获取最近多少天的消息 (默认: 1)'    )
+    
+    parser.add_argument(
+        '--since',
+        type=parse_datetime,
+        help='时间窗口起始时间，指定后忽略 --days (例如: 2025-06-01)'
+    )
+    
+    parser.add_argument(
+        '--until',
+        type=parse_datetime,
+        help='时间窗口结束时间 (默认: 当前时间)'
+    )
     
     parser.add_argument(
         '-p', '--prompt',
@@ -57,6 +81,30 @@ async def run_cli():
         help='自定义总结提示词'
     )
     
+    parser.add_argument(
+        '--max-output-tokens',
+        type=int,
+        help='期望的总结输出长度 (token)，用于选择模型档位'
+    )
+    
+    parser.add_argument(
+        '--media',
+        action='store_true',
+        help='下载消息中的图片和文件到媒体缓存'
+    )
+    
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='增量总结：只发送上次总结之后的新消息并更新原总结'
+    )
+    
+    parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help='安静模式：不在控制台输出日志，只显示一张原地刷新的进度表'
+    )
+    
     parser.add_argument(
         '--all-channels',
         action='store_true',
@@ -84,6 +132,9 @@ async def run_cli():
     
     # 创建InfoCompass实例
     compass = InfoCompass()
+    if args.quiet:
+        set_console_logging(False)
+        compass.reporter = ProgressTable()
     
     # 如果请求批量处理所有频道
     if args.all_channels:
@@ -100,7 +151,12 @@ async def run_cli():
         results = await compass.process_all_channels(
             limit=args.limit,
             days_back=args.days,
-            custom_prompt=args.prompt
+            custom_prompt=args.prompt,
+            download_media=args.media,
+            incremental=args.incremental,
+            since=args.since,
+            until=args.until,
+            max_output_tokens=args.max_output_tokens
         )
         
         print(f"\n✅ 批量处理完成！文件已保存到 {compass.data_dir} 目录")
@@ -119,7 +175,10 @@ async def run_cli():
     print("="*50)
     print(f"频道: {channel}")
     print(f"消息限制: {args.limit}")
-    print(f"天数范围: {args.days}")
+    if args.since or args.until:
+        print(f"时间窗口: {args.since or '-'} ~ {args.until or '现在'}")
+    else:
+        print(f"天数范围: {args.days}")
     if args.prompt:
         print(f"自定义提示: {args.prompt[:50]}...")
     print("="*50)
@@ -130,13 +189,20 @@ async def run_cli():
             channel_username=channel,
             limit=args.limit,
             days_back=args.days,
-            custom_prompt=args.prompt
+            custom_prompt=args.prompt,
+            download_media=args.media,
+            incremental=args.incremental,
+            since=args.since,
+            until=args.until,
+            max_output_tokens=args.max_output_tokens
         )
+        compass.reporter.close()
         
         if result:
             print(f"\n✅ 处理完成！文件已保存到 {compass.data_dir} 目录")
         
     except Exception as e:
+        compass.reporter.close()
         print(f"\n❌ 发生错误: {str(e)}")
         sys.exit(1)
 
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass 日志配置
+日志记录和控制台输出只在调用线程中放入队列，由后台线程写入文件和控制台，避免阻塞事件循环
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+# 当前协程的日志上下文，例如 {'channel': '@channel_name'}
+_log_context: contextvars.ContextVar = contextvars.ContextVar('log_context', default={})
+
+# 标准LogRecord属性，JSON输出时不作为额外字段
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'context'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_console_handler: Optional[logging.Handler] = None
+
+# 进度等控制台输出与日志共用队列和后台线程，按 console_output 属性区分
+_output_logger = logging.getLogger('infocompass.console')
+_output_logger.propagate = False
+
+
+@contextmanager
+def log_context(**fields):
+    """在上下文范围内为日志附加字段，例如 with log_context(channel='@name'):"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def channel_context(func):
+    """协程方法装饰器，将第一个参数 channel_username 作为日志上下文中的 channel 字段"""
+    @functools.wraps(func)
+    async def wrapper(self, channel_username, *args, **kwargs):
+        with log_context(channel=channel_username):
+            return await func(self, channel_username, *args, **kwargs)
+    return wrapper
+
+
+class ContextFilter(logging.Filter):
+    """在放入队列前把当前协程的上下文附加到日志记录上"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _log_context.get()
+        return True
+
+
+class OutputFilter(logging.Filter):
+    """区分控制台输出和普通日志记录"""
+
+    def __init__(self, console_output: bool):
+        super().__init__()
+        self.console_output = console_output
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return getattr(record, 'console_output', False) == self.console_output
+
+
+class ConsoleOutputHandler(logging.StreamHandler):
+    """原样写出控制台输出，收到 flush_event 时在写出之前的内容后通知等待方"""
+
+    terminator = ''
+
+    def emit(self, record: logging.LogRecord):
+        event = getattr(record, 'flush_event', None)
+        if event:
+            self.flush()
+            event.set()
+            return
+        super().emit(record)
+
+
+class TextFormatter(logging.Formatter):
+    """文本格式，有上下文时在消息前加上 [channel=...]"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        context = getattr(record, 'context', None)
+        if context:
+            prefix = ' '.join(f"{key}={value}" for key, value in context.items())
+            head, sep, tail = text.rpartition(record.getMessage())
+            return f"{head}[{prefix}] {sep}{tail}" if sep else text
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志一行JSON，包含上下文字段和 extra 中传入的字段"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'context', None) or {})
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(log_file: str = 'infocompass.log', level: int = logging.INFO,
+                  json_format: bool = False, console: bool = True,
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+    """
+    配置基于队列的日志
+
+    Args:
+        log_file: 日志文件路径
+        level: 日志级别
+        json_format: 文件日志是否使用JSON格式
+        console: 是否输出到控制台
+        max_bytes: 单个日志文件的大小上限，超过后轮转
+        backup_count: 保留的轮转文件数
+    """
+    global _listener, _console_handler
+    if _listener:
+        return
+
+    text_formatter = TextFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonFormatter() if json_format else text_formatter)
+    file_handler.addFilter(OutputFilter(False))
+
+    _console_handler = logging.StreamHandler(sys.stdout)
+    _console_handler.setFormatter(text_formatter)
+    _console_handler.addFilter(OutputFilter(False))
+    if not console:
+        _console_handler.setLevel(logging.CRITICAL + 1)
+
+    output_handler = ConsoleOutputHandler(sys.stdout)
+    output_handler.addFilter(OutputFilter(True))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.handlers = [queue_handler]
+
+    _output_logger.setLevel(logging.INFO)
+    _output_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, _console_handler, output_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def console_write(text: str):
+    """在后台线程中写出控制台内容，未配置日志时直接写出"""
+    if _listener:
+        _output_logger.info(text, extra={'console_output': True})
+    else:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+def flush_console(timeout: float = 5.0):
+    """等待此前的控制台内容写出，用于结束时与之后直接 print 的内容保持顺序"""
+    if not _listener:
+        return
+    done = threading.Event()
+    _output_logger.info('', extra={'console_output': True, 'flush_event': done})
+    done.wait(timeout)
+
+
+def set_console_logging(enabled: bool):
+    """开启或关闭控制台日志，使用进度表时关闭以免打乱表格"""
+    if _console_handler:
+        _console_handler.setLevel(logging.NOTSET if enabled else logging.CRITICAL + 1)
+
+
+def stop_logging():
+    """停止后台写入线程并写出队列中剩余的日志"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
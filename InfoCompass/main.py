@@ -9,8 +9,9 @@ import asyncio
 import json
 import os
 import sys
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional, Tuple
 import logging
 
 from telethon import TelegramClient
@@ -19,17 +20,25 @@ import google.generativeai as genai
 from dotenv import load_dotenv
 import aiofiles
 
+from model_router import ModelRouter
+from media_cache import MediaDownloader
+from message_store import MessageStore
+from topic_cluster import cluster_messages, format_clusters
+from channel_config import ChannelConfig, load_channel_configs
+from message_record import MessageRecord, iter_json_array
+from prompt_compress import CompressionStats, PromptCompressor, compact_date, learn_boilerplate, measure
+from log_setup import channel_context, setup_logging
+from progress import ConsoleReporter
+
 # 加载环境变量
 load_dotenv()
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('infocompass.log', encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
+# 配置日志，由后台线程写入文件和控制台
+setup_logging(
+    log_file=os.getenv('LOG_FILE', 'infocompass.log'),
+    json_format=os.getenv('LOG_FORMAT', 'text').lower() == 'json',
+    max_bytes=int(os.getenv('LOG_MAX_MB', '10')) * 1024 * 1024,
+    backup_count=int(os.getenv('LOG_BACKUPS', '5'))
 )
 logger = logging.getLogger(__name__)
 
@@ -48,29 +57,72 @@ class InfoCompass:
         channels_str = os.getenv('TELEGRAM_CHANNELS', '')
         self.channels = [ch.strip() for ch in channels_str.split(',') if ch.strip()]
         
+        # 频道级配置，配置文件中的频道同样加入频道列表
+        self.channel_configs = load_channel_configs(os.getenv('CHANNELS_CONFIG', 'channels.json'))
+        for channel in self.channel_configs:
+            if channel not in self.channels:
+                self.channels.append(channel)
+        
         # Gemini配置
         self.gemini_api_key = os.getenv('GEMINI_API_KEY')
         
+        # 模型路由配置
+        self.model_router = ModelRouter.from_env()
+        max_output_tokens = os.getenv('SUMMARY_MAX_OUTPUT_TOKENS')
+        self.max_output_tokens = int(max_output_tokens) if max_output_tokens else None
+        for channel, config in self.channel_configs.items():
+            if config.model_tier:
+                self.model_router.channel_tiers.setdefault(channel, config.model_tier)
+        
+        # 话题聚类配置，消息数达到阈值时先聚类再总结 (0表示关闭)
+        self.cluster_min_messages = int(os.getenv('TOPIC_CLUSTER_MIN_MESSAGES', '200'))
+        self.cluster_max_samples = int(os.getenv('TOPIC_CLUSTER_SAMPLES', '15'))
+        
+        # 增量总结配置，超过任一限制时完整重新生成
+        self.incremental_max_runs = int(os.getenv('INCREMENTAL_MAX_RUNS', '6'))
+        self.incremental_full_hours = float(os.getenv('INCREMENTAL_FULL_HOURS', '24'))
+        self.incremental_max_growth = float(os.getenv('INCREMENTAL_MAX_GROWTH', '1.0'))
+        
+        # 提示词压缩配置
+        self.compression_enabled = os.getenv('PROMPT_COMPRESSION', 'true').lower() in ('1', 'true', 'yes')
+        self.boilerplate_min_ratio = float(os.getenv('BOILERPLATE_MIN_RATIO', '0.1'))
+        self.boilerplate_history = int(os.getenv('BOILERPLATE_HISTORY', '1000'))
+        self.boilerplate_refresh_hours = float(os.getenv('BOILERPLATE_REFRESH_HOURS', '24'))
+        # 每个频道的压缩器 (学习时间, 压缩器) 和最近一次的压缩统计
+        self.compressors: Dict[str, Tuple[float, PromptCompressor]] = {}
+        self.compression_stats: Dict[str, CompressionStats] = {}
+        
         # 验证配置
         self._validate_config()
         
         # 初始化客户端
         self.telegram_client = TelegramClient('infocompass_session', self.api_id, self.api_hash)
-          # 配置Gemini
-        genai.configure(api_key=self.gemini_api_key)
-        self.gemini_model = genai.GenerativeModel('gemini-2.0-flash-lite')
+        # 配置Gemini，模型句柄由路由器按需创建并复用
+        if self.gemini_api_key:
+            genai.configure(api_key=self.gemini_api_key)
         
         # 数据存储目录
         self.data_dir = 'data'
         os.makedirs(self.data_dir, exist_ok=True)
+        
+        # 频道消息历史
+        self.message_store = MessageStore(self.data_dir)
+        
+        # 媒体下载器，首次需要下载媒体时创建
+        self.media_downloader = None
+        
+        # 控制台进度输出，安静模式下替换为进度表
+        self.reporter = ConsoleReporter()
     
     def _validate_config(self):
         """验证配置参数"""
         required_vars = {
             'TELEGRAM_API_ID': self.api_id,
-            'TELEGRAM_API_HASH': self.api_hash,
-            'GEMINI_API_KEY': self.gemini_api_key
+            'TELEGRAM_API_HASH': self.api_hash
         }
+        # 使用本地替身模型时不需要Gemini密钥
+        if self.model_router.backend_name == 'gemini':
+            required_vars['GEMINI_API_KEY'] = self.gemini_api_key
         
         missing_vars = [var for var, value in required_vars.items() if not value]
         if missing_vars:
@@ -90,14 +142,86 @@ class InfoCompass:
         else:
             logger.info(f"已配置 {len(self.channels)} 个频道: {', '.join(self.channels)}")
     
-    async def get_channel_messages(self, channel_username: str, limit: int = 100, days_back: int = 1) -> List[Dict]:
+    async def connect(self):
+        """连接Telegram并在需要时完成登录"""
+        # 对于公开频道，尝试不登录连接
+        try:
+            # 检查会话文件
+            session_file = 'infocompass_session.session'
+            if os.path.exists(session_file):
+                logger.info(f"会话文件存在: {session_file}, 大小: {os.path.getsize(session_file)} 字节")
+            else:
+                logger.info(f"会话文件不存在: {session_file}")
+
+            # 使用with语句确保客户端会正确启动和关闭
+            if not self.telegram_client.is_connected():
+                logger.info("尝试连接到Telegram...")
+                await self.telegram_client.connect()
+                logger.info("已连接到Telegram客户端")
+            else:
+                logger.info("Telegram客户端已经连接")
+
+            # 检查是否已经授权
+            is_authorized = await self.telegram_client.is_user_authorized()
+            logger.info(f"客户端授权状态: {'已授权' if is_authorized else '未授权'}")
+
+            if not is_authorized:
+                logger.info("需要登录Telegram...")
+                if self.phone_number:
+                    # 发送验证码
+                    await self.telegram_client.send_code_request(self.phone_number)
+                    logger.info(f"验证码已发送到 {self.phone_number}")
+
+                    # 等待用户输入验证码
+                    verification_code = input("请输入收到的验证码: ")
+
+                    try:
+                        # 尝试使用验证码登录
+                        await self.telegram_client.sign_in(self.phone_number, verification_code)
+                        logger.info("登录成功！")
+
+                        # 再次检查授权状态
+                        is_authorized = await self.telegram_client.is_user_authorized()
+                        logger.info(f"登录后授权状态: {'已授权' if is_authorized else '仍未授权'}")
+                    except Exception as sign_in_error:
+                        # 如果是两步验证，需要密码
+                        if "2FA" in str(sign_in_error) or "password" in str(sign_in_error).lower():
+                            password = input("请输入两步验证密码: ")
+                            await self.telegram_client.sign_in(password=password)
+                            logger.info("两步验证登录成功！")
+
+                            # 再次检查授权状态
+                            is_authorized = await self.telegram_client.is_user_authorized()
+                            logger.info(f"两步验证后授权状态: {'已授权' if is_authorized else '仍未授权'}")
+                        else:
+                            raise sign_in_error
+                else:
+                    logger.warning("无法连接到Telegram，未提供电话号码")
+                    raise Exception("登录需要电话号码，请在环境变量中设置 TELEGRAM_PHONE")
+            else:
+                logger.info("已连接到Telegram (已授权)")
+        except Exception as e:
+            logger.error(f"连接Telegram时发生错误: {str(e)}")
+            raise e
+
+    async def get_channel_messages(self, channel_username: str, limit: Optional[int] = 100, days_back: int = 1,
+                                   download_media: bool = False, min_id: int = 0,
+                                   since: Optional[datetime] = None,
+                                   until: Optional[datetime] = None) -> List[MessageRecord]:
         """
         获取Telegram频道消息
         
+        从时间窗口的结束时间开始由新到旧获取，遇到早于起始时间的消息即停止；
+        指定 min_id 时以 min_id 作为唯一的下界，不按起始时间截止。
+        
         Args:
             channel_username: 频道用户名 (例如: @channel_name)
-            limit: 获取消息数量限制
-            days_back: 获取多少天前的消息
+            limit: 获取消息数量上限，仅作为安全限制，为空时不限制
+            days_back: 获取最近多少天的消息，指定 since 时忽略
+            download_media: 是否下载消息中的图片和文件到媒体缓存
+            min_id: 只获取ID大于该值的消息
+            since: 时间窗口起始时间 (默认: 当前时间往前 days_back 天)，指定 min_id 时忽略
+            until: 时间窗口结束时间 (默认: 当前时间)
         
         Returns:
             消息列表
@@ -105,70 +229,18 @@ class InfoCompass:
         messages = []
         
         try:
-            # 对于公开频道，尝试不登录连接
-            try:
-                # 检查会话文件
-                session_file = 'infocompass_session.session'
-                if os.path.exists(session_file):
-                    logger.info(f"会话文件存在: {session_file}, 大小: {os.path.getsize(session_file)} 字节")
-                else:
-                    logger.info(f"会话文件不存在: {session_file}")
-
-                # 使用with语句确保客户端会正确启动和关闭
-                if not self.telegram_client.is_connected():
-                    logger.info("尝试连接到Telegram...")
-                    await self.telegram_client.connect()
-                    logger.info("已连接到Telegram客户端")
-                else:
-                    logger.info("Telegram客户端已经连接")
-
-                # 检查是否已经授权
-                is_authorized = await self.telegram_client.is_user_authorized()
-                logger.info(f"客户端授权状态: {'已授权' if is_authorized else '未授权'}")
-
-                if not is_authorized:
-                    logger.info("需要登录Telegram...")
-                    if self.phone_number:
-                        # 发送验证码
-                        await self.telegram_client.send_code_request(self.phone_number)
-                        logger.info(f"验证码已发送到 {self.phone_number}")
-
-                        # 等待用户输入验证码
-                        verification_code = input("请输入收到的验证码: ")
-
-                        try:
-                            # 尝试使用验证码登录
-                            await self.telegram_client.sign_in(self.phone_number, verification_code)
-                            logger.info("登录成功！")
-
-                            # 再次检查授权状态
-                            is_authorized = await self.telegram_client.is_user_authorized()
-                            logger.info(f"登录后授权状态: {'已授权' if is_authorized else '仍未授权'}")
-                        except Exception as sign_in_error:
-                            # 如果是两步验证，需要密码
-                            if "2FA" in str(sign_in_error) or "password" in str(sign_in_error).lower():
-                                password = input("请输入两步验证密码: ")
-                                await self.telegram_client.sign_in(password=password)
-                                logger.info("两步验证登录成功！")
-
-                                # 再次检查授权状态
-                                is_authorized = await self.telegram_client.is_user_authorized()
-                                logger.info(f"两步验证后授权状态: {'已授权' if is_authorized else '仍未授权'}")
-                            else:
-                                raise sign_in_error
-                    else:
-                        logger.warning("无法连接到Telegram，未提供电话号码")
-                        raise Exception("登录需要电话号码，请在环境变量中设置 TELEGRAM_PHONE")
-                else:
-                    logger.info("已连接到Telegram (已授权)")
-            except Exception as e:
-                logger.error(f"连接Telegram时发生错误: {str(e)}")
-                raise e
+            await self.connect()
 
             logger.info(f"开始获取频道 {channel_username} 的消息")
             
-            # 计算时间范围
-            since_date = datetime.now() - timedelta(days=days_back)
+            # 计算时间范围，Telegram消息时间为UTC
+            until_date = (until or datetime.now(timezone.utc)).astimezone(timezone.utc)
+            if min_id:
+                since_date = None
+                logger.info(f"获取ID大于 {min_id} 且早于 {until_date.isoformat()} 的消息")
+            else:
+                since_date = (since or until_date - timedelta(days=days_back)).astimezone(timezone.utc)
+                logger.info(f"时间窗口: {since_date.isoformat()} ~ {until_date.isoformat()}")
             
             # 获取频道实体
             try:
@@ -179,30 +251,45 @@ class InfoCompass:
                 return []
 
             messages_count = 0
-            # 获取消息
+            scanned_count = 0
+            media_messages = []
+            # 获取消息，offset_date 表示从早于该时间的消息开始由新到旧遍历
             async for message in self.telegram_client.iter_messages(
                 channel, 
                 limit=limit,
-                offset_date=since_date
+                offset_date=until_date,
+                min_id=min_id
             ):
-                if message.message:  # 只处理有文本内容的消息
-                    message_data = {
-                        'id': message.id,
-                        'date': message.date.isoformat(),
-                        'text': message.message,
-                        'views': getattr(message, 'views', 0),
-                        'forwards': getattr(message, 'forwards', 0),
-                        'replies': getattr(message.replies, 'replies', 0) if message.replies else 0,
-                        'has_media': bool(message.media),
-                        'media_type': self._get_media_type(message.media) if message.media else None
-                    }
-                    messages.append(message_data)
-
+                scanned_count += 1
+                if since_date and message.date < since_date:  # 已超出时间窗口，后续消息更早
+                    break
+                record = None
+                if message.message:  # 只为有文本内容的消息生成消息记录
+                    record = self._build_message_record(message)
+                    messages.append(record)
+                # 没有配文的图片和文件同样下载归档
+                if download_media and message.media:
+                    media_messages.append((record, message))
+
+                if record is not None:
                     messages_count += 1
                     if messages_count % 10 == 0:  # 每获取10条消息后暂停
                         await asyncio.sleep(1)
+            else:
+                if limit and scanned_count >= limit:
+                    logger.warning(f"已达到消息数量上限 {limit}，时间窗口内可能还有更早的消息")
             
-            logger.info(f"成功获取 {len(messages)} 条消息")
+            # 并发下载媒体
+            if media_messages:
+                if self.media_downloader is None:
+                    self.media_downloader = MediaDownloader.from_env(self.telegram_client, self.data_dir)
+                logger.info(f"开始下载 {len(media_messages)} 个媒体文件")
+                paths = await self.media_downloader.download_all([message for _, message in media_messages])
+                for (record, _), path in zip(media_messages, paths):
+                    if record is not None:
+                        record.media_path = path
+            
+            logger.info(f"成功获取 {len(messages)} 条消息", extra={'message_count': len(messages)})
             return messages
             
         except Exception as e:
@@ -212,6 +299,23 @@ class InfoCompass:
             # 我们不在这里断开连接，因为可能需要处理多个频道
             pass
 
+    def get_channel_config(self, channel_username: str) -> ChannelConfig:
+        """获取频道配置，未配置的频道返回默认配置"""
+        return self.channel_configs.get(channel_username) or ChannelConfig()
+
+    def _build_message_record(self, message) -> MessageRecord:
+        """将Telegram消息转换为消息记录"""
+        return MessageRecord(
+            id=message.id,
+            date=message.date,
+            text=message.message,
+            views=getattr(message, 'views', 0),
+            forwards=getattr(message, 'forwards', 0),
+            replies=getattr(message.replies, 'replies', 0) if message.replies else 0,
+            has_media=bool(message.media),
+            media_type=self._get_media_type(message.media) if message.media else None
+        )
+
     def _get_media_type(self, media) -> str:
         """获取媒体类型"""
         if isinstance(media, MessageMediaPhoto):
@@ -221,7 +325,7 @@ class InfoCompass:
         else:
             return 'other'
     
-    async def save_messages(self, messages: List[Dict], channel_name: str) -> str:
+    async def save_messages(self, messages: List[MessageRecord], channel_name: str) -> str:
         """
         保存消息到本地文件
         
@@ -238,7 +342,9 @@ class InfoCompass:
         
         try:
             async with aiofiles.open(filepath, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(messages, ensure_ascii=False, indent=2))
+                # 分批写入，不在内存中拼接整个文件
+                for chunk in iter_json_array(messages):
+                    await f.write(chunk)
             
             logger.info(f"消息已保存到: {filepath}")
             return filepath
@@ -247,24 +353,86 @@ class InfoCompass:
             logger.error(f"保存消息时发生错误: {str(e)}")
             raise
     
-    async def summarize_with_gemini(self, messages: List[Dict], custom_prompt: str = None) -> str:
+    async def get_compressor(self, channel_username: str, messages: List[MessageRecord]) -> PromptCompressor:
+        """
+        获取频道的提示词压缩器
+        
+        样板行从本地历史中最近写入的消息学习，没有历史时从本次的消息学习；
+        超过 boilerplate_refresh_hours 后重新学习，长时间运行的服务和调度器也能跟上频道格式的变化。
+        """
+        cached = self.compressors.get(channel_username)
+        if cached and time.monotonic() - cached[0] < self.boilerplate_refresh_hours * 3600:
+            return cached[1]
+        
+        channel_name = channel_username.replace('@', '').replace('/', '_')
+        history = await self.message_store.load_recent(channel_name, self.boilerplate_history)
+        boilerplate = learn_boilerplate(
+            (msg.text for msg in (history or messages) if msg.text),
+            min_ratio=self.boilerplate_min_ratio
+        )
+        logger.info(f"频道 {channel_username} 学习到 {len(boilerplate)} 种样板行")
+        compressor = PromptCompressor(boilerplate)
+        self.compressors[channel_username] = (time.monotonic(), compressor)
+        return compressor
+
+    async def _format_messages(self, messages: List[MessageRecord], channel_username: str = None) -> str:
+        """将消息格式化为提示词中的消息内容"""
+        format_date = datetime.isoformat
+        if self.compression_enabled and channel_username:
+            compressor = await self.get_compressor(channel_username, messages)
+            chars_before, tokens_before = measure(msg.text for msg in messages if msg.text)
+            messages = compressor.compress_messages(messages)
+            chars_after, tokens_after = measure(msg.text for msg in messages)
+            stats = CompressionStats(chars_before, chars_after, tokens_before, tokens_after,
+                                     len(compressor.boilerplate))
+            self.compression_stats[channel_username] = stats
+            logger.info(f"频道 {channel_username} 提示词压缩: {stats}", extra=vars(stats))
+            format_date = compact_date
+
+        # 消息较多时按话题聚类，每个话题只保留代表性消息；聚类是CPU密集计算，
+        # 放到线程中执行以免阻塞事件循环上的HTTP服务和其他频道
+        if self.cluster_min_messages and len(messages) >= self.cluster_min_messages:
+            clusters = await asyncio.to_thread(
+                cluster_messages, messages, max_samples=self.cluster_max_samples
+            )
+            return "以下消息已按话题预先分组：\n\n" + format_clusters(clusters, format_date)
+
+        # 合并所有消息文本
+        return "\n\n".join([
+            f"消息{i+1} ({format_date(msg.date)}):\n{msg.text}"
+            for i, msg in enumerate(messages)
+            if msg.text
+        ])
+
+    async def _generate(self, prompt: str, channel_username: str = None,
+                        max_output_tokens: int = None) -> str:
+        """按提示词规模和期望输出长度选择模型并生成文本"""
+        tier, backend = self.model_router.route(prompt, max_output_tokens, channel_username)
+        logger.info(f"正在使用 {tier.model_name} 生成总结...")
+        return await asyncio.to_thread(
+            backend.generate,
+            prompt,
+            # 超出所有档位时使用最大档位，输出长度不能超过其上限
+            min(max_output_tokens, tier.max_output_tokens) if max_output_tokens else None
+        )
+
+    async def summarize_with_gemini(self, messages: List[MessageRecord], custom_prompt: str = None,
+                                    channel_username: str = None,
+                                    max_output_tokens: int = None) -> str:
         """
         使用Gemini API总结消息
         
         Args:
             messages: 消息列表
             custom_prompt: 自定义提示词
+            channel_username: 频道用户名，用于按频道选择模型档位
+            max_output_tokens: 期望的输出长度上限
         
         Returns:
             总结文本
         """
         try:
-            # 合并所有消息文本
-            combined_text = "\n\n".join([
-                f"消息{i+1} ({msg['date']}):\n{msg['text']}"
-                for i, msg in enumerate(messages)
-                if msg.get('text')
-            ])
+            combined_text = await self._format_messages(messages, channel_username)
             
             # 构建提示词
             if custom_prompt:
@@ -289,14 +457,7 @@ class InfoCompass:
 - 总体趋势分析
 """
             
-            # 调用Gemini API
-            logger.info("正在使用Gemini API生成总结...")
-            response = await asyncio.to_thread(
-                self.gemini_model.generate_content, 
-                prompt
-            )
-            
-            summary = response.text
+            summary = await self._generate(prompt, channel_username, max_output_tokens)
             logger.info("总结生成完成")
             
             return summary
@@ -305,6 +466,80 @@ class InfoCompass:
             logger.error(f"使用Gemini总结时发生错误: {str(e)}")
             raise
     
+    async def update_summary_with_gemini(self, previous_summary: str, messages: List[MessageRecord],
+                                         custom_prompt: str = None, channel_username: str = None,
+                                         max_output_tokens: int = None) -> str:
+        """
+        基于上一次的总结和新消息生成更新后的总结
+        
+        Args:
+            previous_summary: 上一次的总结
+            messages: 上一次总结之后的新消息
+            custom_prompt: 自定义提示词
+            channel_username: 频道用户名
+            max_output_tokens: 期望的输出长度上限
+        
+        Returns:
+            更新后的总结文本
+        """
+        try:
+            combined_text = await self._format_messages(messages, channel_username)
+            focus = f"\n总结重点：{custom_prompt}\n" if custom_prompt else ""
+            prompt = f"""
+以下是某Telegram频道之前的总结，以及该总结生成之后频道发布的新消息。
+{focus}
+任务要求：
+1. 在原总结的基础上融入新消息中的话题、关键信息和事件
+2. 新消息与原总结冲突时以新消息为准
+3. 删除已过时的内容，保持总结简洁
+4. 保持原总结的结构和格式，输出完整的更新后总结，而不是只输出变化部分
+
+原总结：
+{previous_summary}
+
+新消息：
+{combined_text}
+
+请用中文回答。
+"""
+            summary = await self._generate(prompt, channel_username, max_output_tokens)
+            logger.info(f"增量总结生成完成，新消息 {len(messages)} 条")
+            return summary
+            
+        except Exception as e:
+            logger.error(f"使用Gemini更新总结时发生错误: {str(e)}")
+            raise
+    
+    def _summary_state_path(self, channel_name: str) -> str:
+        return os.path.join(self.data_dir, 'summaries', f"{channel_name}.json")
+    
+    async def load_summary_state(self, channel_name: str) -> Optional[Dict]:
+        """读取频道最近一次的结构化总结"""
+        path = self._summary_state_path(channel_name)
+        if not os.path.exists(path):
+            return None
+        async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+            return json.loads(await f.read())
+    
+    async def save_summary_state(self, channel_name: str, state: Dict):
+        """保存频道的结构化总结"""
+        path = self._summary_state_path(channel_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        async with aiofiles.open(tmp_path, 'w', encoding='utf-8') as f:
+            await f.write(json.dumps(state, ensure_ascii=False, indent=2))
+        os.replace(tmp_path, path)
+    
+    def _needs_full_summary(self, state: Dict) -> bool:
+        """判断增量总结是否已累积过多偏差，需要完整重新生成"""
+        if state['incremental_runs'] >= self.incremental_max_runs:
+            return True
+        full_at = datetime.fromisoformat(state['full_generated_at'])
+        if datetime.now() - full_at >= timedelta(hours=self.incremental_full_hours):
+            return True
+        # 新消息累积量超过完整总结时消息量的一定比例
+        return state['incremental_messages'] > state['full_message_count'] * self.incremental_max_growth
+    
     async def save_summary(self, summary: str, channel_name: str) -> str:
         """
         保存总结到本地文件
@@ -334,69 +569,150 @@ class InfoCompass:
             logger.error(f"保存总结时发生错误: {str(e)}")
             raise
     
+    @channel_context
     async def process_channel(self, channel_username: str, limit: int = 100, 
-                            days_back: int = 1, custom_prompt: str = None) -> Dict[str, str]:
+                            days_back: int = 1, custom_prompt: str = None,
+                            download_media: bool = False,
+                            incremental: bool = False,
+                            since: Optional[datetime] = None,
+                            until: Optional[datetime] = None,
+                            max_output_tokens: Optional[int] = None) -> Dict[str, str]:
         """
         处理频道消息的完整流程
         
+        频道配置中的消息上限和天数优先于传入的参数，传入的提示词优先于频道提示词，
+        所有入口 (命令行、批量处理、HTTP服务和调度器) 使用相同的规则。
+        
         Args:
             channel_username: 频道用户名
-            limit: 消息数量限制
+            limit: 消息数量限制，增量更新时不限制
             days_back: 获取天数
             custom_prompt: 自定义总结提示词
+            download_media: 是否下载媒体文件
+            incremental: 是否只发送上一次总结之后的新消息并更新原总结
+            since: 时间窗口起始时间
+            until: 时间窗口结束时间
+            max_output_tokens: 期望的总结输出长度，为空时依次使用频道配置和环境变量
         
         Returns:
-            包含文件路径的字典
+            包含文件路径、总结、消息数和新消息数的字典，
+            没有上一次总结可比较时新消息数为空
         """
         try:
             # 清理频道名称作为文件名
             channel_name = channel_username.replace('@', '').replace('/', '_')
             
-            # 1. 获取消息
-            print(f"📱 正在获取频道 {channel_username} 的消息...")
-            messages = await self.get_channel_messages(channel_username, limit, days_back)
+            # 合并频道配置
+            config = self.get_channel_config(channel_username)
+            limit = config.limit or limit
+            days_back = config.days_back or days_back
+            custom_prompt = custom_prompt or config.prompt
+            max_output_tokens = max_output_tokens or config.max_output_tokens or self.max_output_tokens
+            
+            # 增量模式下读取上一次的总结，偏差超过限制时完整重新生成
+            state = await self.load_summary_state(channel_name) if incremental else None
+            use_delta = state is not None and not self._needs_full_summary(state)
+            previous_last_id = state['last_message_id'] if state else None
+            if state and not use_delta:
+                self.reporter.stage(channel_username, "♻️ 增量总结已达到偏差限制，将完整重新生成")
+            
+            # 1. 获取消息，增量模式下不限制数量也不按时间窗口截止，按 min_id 取完上一次总结之后的
+            # 全部消息，否则被跳过的较早消息会因 last_message_id 前移而不再进入任何总结
+            self.reporter.stage(channel_username, f"📱 正在获取频道 {channel_username} 的消息...")
+            messages = await self.get_channel_messages(
+                channel_username, None if use_delta else limit, days_back, download_media,
+                min_id=state['last_message_id'] if use_delta else 0,
+                since=since,
+                until=until
+            )
             
             if not messages:
-                print("❌ 未获取到任何消息")
+                if use_delta:
+                    self.reporter.stage(channel_username, "ℹ️ 没有新消息，沿用上一次的总结", messages=0)
+                    return {
+                        'summary_file': state.get('summary_file'),
+                        'summary': state['summary'],
+                        'message_count': 0,
+                        'new_message_count': 0
+                    }
+                self.reporter.stage(channel_username, "❌ 未获取到任何消息", messages=0)
                 return {}
             
-            print(f"✅ 成功获取 {len(messages)} 条消息")
+            self.reporter.stage(channel_username, f"✅ 成功获取 {len(messages)} 条消息", messages=len(messages))
             
             # 2. 保存消息
-            print("💾 正在保存消息到本地...")
+            self.reporter.stage(channel_username, "💾 正在保存消息到本地...")
             messages_file = await self.save_messages(messages, channel_name)
+            await self.message_store.append(channel_name, messages)
             
             # 3. 生成总结
-            print("🤖 正在使用Gemini生成总结...")
-            summary = await self.summarize_with_gemini(messages, custom_prompt)
+            if use_delta:
+                self.reporter.stage(channel_username, f"🤖 正在使用Gemini基于 {len(messages)} 条新消息更新总结...")
+                summary = await self.update_summary_with_gemini(
+                    state['summary'], messages, custom_prompt, channel_username, max_output_tokens
+                )
+                state['incremental_runs'] += 1
+                state['incremental_messages'] += len(messages)
+            else:
+                self.reporter.stage(channel_username, "🤖 正在使用Gemini生成总结...")
+                summary = await self.summarize_with_gemini(messages, custom_prompt, channel_username,
+                                                           max_output_tokens)
+                state = {
+                    'channel': channel_username,
+                    'full_generated_at': datetime.now().isoformat(),
+                    'full_message_count': len(messages),
+                    'incremental_runs': 0,
+                    'incremental_messages': 0,
+                    'last_message_id': 0
+                }
+            
+            stats = self.compression_stats.get(channel_username)
+            if stats:
+                self.reporter.stage(channel_username, f"🗜️ 提示词压缩: {stats}")
             
             # 4. 保存总结
-            print("📝 正在保存总结...")
+            self.reporter.stage(channel_username, "📝 正在保存总结...")
             summary_file = await self.save_summary(summary, channel_name)
+            state.update(
+                summary=summary,
+                summary_file=summary_file,
+                generated_at=datetime.now().isoformat(),
+                last_message_id=max(state['last_message_id'], max(msg.id for msg in messages))
+            )
+            await self.save_summary_state(channel_name, state)
             
-            print("🎉 处理完成！")
-            print(f"📄 消息文件: {messages_file}")
-            print(f"📋 总结文件: {summary_file}")
+            self.reporter.stage(channel_username, "🎉 处理完成！")
+            self.reporter.detail(f"📄 消息文件: {messages_file}")
+            self.reporter.detail(f"📋 总结文件: {summary_file}")
             
             # 显示总结预览
-            print("\n" + "="*50)
-            print("📊 总结预览:")
-            print("="*50)
-            print(summary[:500] + "..." if len(summary) > 500 else summary)
+            self.reporter.detail("\n" + "="*50)
+            self.reporter.detail("📊 总结预览:")
+            self.reporter.detail("="*50)
+            self.reporter.detail(summary[:500] + "..." if len(summary) > 500 else summary)
             
             return {
                 'messages_file': messages_file,
                 'summary_file': summary_file,
-                'summary': summary
+                'summary': summary,
+                'message_count': len(messages),
+                # 完整生成时 message_count 是整个时间窗口的消息数，这里只统计上一次总结之后的新消息
+                'new_message_count': (sum(1 for msg in messages if msg.id > previous_last_id)
+                                      if previous_last_id is not None else None)
             }
             
         except Exception as e:
             logger.error(f"处理频道时发生错误: {str(e)}")
-            print(f"❌ 处理失败: {str(e)}")
+            self.reporter.stage(channel_username, f"❌ 处理失败: {str(e)}")
             raise
 
     async def process_all_channels(self, limit: int = 100, days_back: int = 1, 
-                                 custom_prompt: str = None) -> Dict[str, Dict]:
+                                 custom_prompt: str = None,
+                                 download_media: bool = False,
+                                 incremental: bool = False,
+                                 since: Optional[datetime] = None,
+                                 until: Optional[datetime] = None,
+                                 max_output_tokens: Optional[int] = None) -> Dict[str, Dict]:
         """
         批量处理所有配置的频道
         
@@ -404,6 +720,11 @@ class InfoCompass:
             limit: 消息数量限制
             days_back: 获取天数
             custom_prompt: 自定义总结提示词
+            download_media: 是否下载媒体文件
+            incremental: 是否使用增量总结
+            since: 时间窗口起始时间
+            until: 时间窗口结束时间
+            max_output_tokens: 期望的总结输出长度
         
         Returns:
             所有频道的处理结果
@@ -415,27 +736,37 @@ class InfoCompass:
         results = {}
         total_channels = len(self.channels)
         
-        print(f"🚀 开始批量处理 {total_channels} 个频道...")
+        self.reporter.detail(f"🚀 开始批量处理 {total_channels} 个频道...")
         
-        for i, channel in enumerate(self.channels, 1):
-            print(f"\n📺 [{i}/{total_channels}] 处理频道: {channel}")
-            print("-" * 50)
+        # 按优先级从高到低处理
+        channels = sorted(self.channels, key=lambda ch: -self.get_channel_config(ch).priority)
+        
+        for i, channel in enumerate(channels, 1):
+            self.reporter.detail(f"\n📺 [{i}/{total_channels}] 处理频道: {channel}")
+            self.reporter.detail("-" * 50)
             
+            # 频道配置在 process_channel 中合并
             try:
                 result = await self.process_channel(
                     channel_username=channel,
                     limit=limit,
                     days_back=days_back,
-                    custom_prompt=custom_prompt
+                    custom_prompt=custom_prompt,
+                    download_media=download_media,
+                    incremental=incremental,
+                    since=since,
+                    until=until,
+                    max_output_tokens=max_output_tokens
                 )
                 results[channel] = result
-                print(f"✅ 频道 {channel} 处理完成")
+                self.reporter.stage(channel, f"✅ 频道 {channel} 处理完成")
                 
             except Exception as e:
                 logger.error(f"处理频道 {channel} 时发生错误: {str(e)}")
                 results[channel] = {'error': str(e)}
-                print(f"❌ 频道 {channel} 处理失败: {str(e)}")
+                self.reporter.stage(channel, f"❌ 频道 {channel} 处理失败: {str(e)}")
         
+        self.reporter.close()
         print(f"\n🎉 批量处理完成！")
         print(f"✅ 成功: {len([r for r in results.values() if 'error' not in r])} 个频道")
         print(f"❌ 失败: {len([r for r in results.values() if 'error' in r])} 个频道")
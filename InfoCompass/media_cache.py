@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass 媒体缓存
+按Telegram文件ID寻址的媒体缓存和并发下载器
+"""
+
+import asyncio
+import glob
+import os
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from telethon.tl.types import MessageMediaPhoto, MessageMediaDocument
+
+logger = logging.getLogger(__name__)
+
+# 临时下载文件名的前缀，见 MediaCache.temp_path
+TEMP_PREFIXES = ('.photo_', '.document_')
+
+
+def get_media_key(media) -> Optional[Tuple[str, str]]:
+    """
+    获取媒体的缓存键
+
+    使用Telegram的文件ID作为键，转发到不同频道的同一文件ID相同，只需下载一次。
+
+    Returns:
+        (媒体类型, 缓存键)，不支持的媒体返回None
+    """
+    if isinstance(media, MessageMediaPhoto) and media.photo:
+        return 'photo', f"photo_{media.photo.id}"
+    if isinstance(media, MessageMediaDocument) and media.document:
+        return 'document', f"document_{media.document.id}"
+    return None
+
+
+def get_media_size(media) -> int:
+    """获取媒体文件大小 (字节)，无法获取时返回0"""
+    if isinstance(media, MessageMediaDocument) and media.document:
+        return getattr(media.document, 'size', 0) or 0
+    if isinstance(media, MessageMediaPhoto) and media.photo:
+        sizes = [getattr(size, 'size', 0) or 0 for size in getattr(media.photo, 'sizes', [])]
+        return max(sizes, default=0)
+    return 0
+
+
+class MediaCache:
+    """内容寻址的媒体缓存目录，超过容量上限时按最近使用时间淘汰"""
+
+    # 淘汰时降到容量上限的该比例以下，避免接近上限时每次写入都触发淘汰
+    EVICT_TARGET = 0.9
+    # 超过该时间 (秒) 仍未完成的临时文件视为中断的下载，其他进程正在进行的下载不受影响
+    STALE_TEMP_SECONDS = 3600
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        """
+        初始化媒体缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存目录容量上限 (字节)
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # 缓存键 -> (文件名, 大小) 索引和总大小，避免每次查找或写入都扫描目录
+        self._index: Dict[str, Tuple[str, int]] = {}
+        self.total_bytes = 0
+        now = time.time()
+        for filename in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, filename)
+            if not os.path.isfile(path):
+                continue
+            if filename.startswith('.'):
+                # 之前的运行中断留下的未完成下载
+                if filename.startswith(TEMP_PREFIXES) and now - os.path.getmtime(path) > self.STALE_TEMP_SECONDS:
+                    os.remove(path)
+                    logger.info(f"已清理未完成的媒体下载: {path}")
+                continue
+            size = os.path.getsize(path)
+            self._index[os.path.splitext(filename)[0]] = (filename, size)
+            self.total_bytes += size
+
+    def lookup(self, key: str) -> Optional[str]:
+        """查找缓存文件，命中时刷新访问时间"""
+        entry = self._index.get(key)
+        if not entry:
+            return None
+        path = os.path.join(self.cache_dir, entry[0])
+        if not os.path.exists(path):
+            self._forget(key)
+            return None
+        os.utime(path)
+        return path
+
+    def temp_path(self, key: str) -> str:
+        """下载用的临时路径，不带扩展名以便Telethon补全实际的文件扩展名"""
+        return os.path.join(self.cache_dir, f".{key}")
+
+    def discard_temp(self, key: str):
+        """删除下载失败留下的临时文件，只匹配该键本身，不影响前缀相同的其他键"""
+        temp_path = self.temp_path(key)
+        for path in [temp_path] + glob.glob(glob.escape(temp_path) + '.*'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def commit(self, key: str, downloaded_path: str) -> str:
+        """将下载完成的临时文件移入缓存，总大小超过上限时淘汰"""
+        filename = key + os.path.splitext(downloaded_path)[1]
+        path = os.path.join(self.cache_dir, filename)
+        os.replace(downloaded_path, path)
+        self._forget(key)
+        size = os.path.getsize(path)
+        self._index[key] = (filename, size)
+        self.total_bytes += size
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+        return path
+
+    def _forget(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry:
+            self.total_bytes -= entry[1]
+
+    def evict(self):
+        """按最近使用时间淘汰文件，直到缓存容量降到上限的 EVICT_TARGET 以下"""
+        entries = []
+        for key, (filename, _) in self._index.items():
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                entries.append((os.stat(path).st_mtime, key, path))
+            except FileNotFoundError:
+                entries.append((0.0, key, None))
+
+        target = self.max_bytes * self.EVICT_TARGET
+        for _, key, path in sorted(entries):
+            if self.total_bytes <= target:
+                break
+            if path:
+                os.remove(path)
+                logger.info(f"媒体缓存已淘汰: {path}")
+            self._forget(key)
+
+
+class MediaDownloader:
+    """有并发上限的媒体下载器"""
+
+    def __init__(self, client, cache: MediaCache, concurrency: int = 4,
+                 max_file_bytes: int = 20 * 1024 * 1024,
+                 media_types: Optional[List[str]] = None):
+        """
+        初始化媒体下载器
+
+        Args:
+            client: Telegram客户端
+            cache: 媒体缓存
+            concurrency: 最大并发下载数
+            max_file_bytes: 单个文件大小上限 (字节)
+            media_types: 允许下载的媒体类型 (photo / document)
+        """
+        self.client = client
+        self.cache = cache
+        self.max_file_bytes = max_file_bytes
+        self.media_types = media_types or ['photo', 'document']
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def from_env(cls, client, data_dir: str) -> 'MediaDownloader':
+        """从环境变量创建下载器"""
+        cache = MediaCache(
+            os.getenv('MEDIA_CACHE_DIR', os.path.join(data_dir, 'media')),
+            int(os.getenv('MEDIA_CACHE_MAX_MB', '1024')) * 1024 * 1024
+        )
+        media_types = [t.strip() for t in os.getenv('MEDIA_TYPES', 'photo,document').split(',') if t.strip()]
+        return cls(
+            client,
+            cache,
+            concurrency=int(os.getenv('MEDIA_DOWNLOAD_CONCURRENCY', '4')),
+            max_file_bytes=int(os.getenv('MEDIA_MAX_FILE_MB', '20')) * 1024 * 1024,
+            media_types=media_types
+        )
+
+    async def download(self, message) -> Optional[str]:
+        """
+        下载单条消息的媒体
+
+        Returns:
+            缓存文件路径，被过滤或下载失败时返回None
+        """
+        media_key = get_media_key(message.media)
+        if not media_key:
+            return None
+
+        media_type, key = media_key
+        if media_type not in self.media_types:
+            return None
+
+        size = get_media_size(message.media)
+        if size > self.max_file_bytes:
+            logger.info(f"跳过过大的媒体文件 {key}: {size} 字节")
+            return None
+
+        cached = self.cache.lookup(key)
+        if cached:
+            return cached
+
+        # 同一文件正在下载时复用已有任务
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(message, key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await task
+
+    async def _fetch(self, message, key: str) -> Optional[str]:
+        async with self._semaphore:
+            try:
+                downloaded = await self.client.download_media(message, file=self.cache.temp_path(key))
+                if not downloaded:
+                    return None
+                path = self.cache.commit(key, downloaded)
+                logger.info(f"媒体已下载: {path}")
+                return path
+            except Exception as e:
+                logger.error(f"下载媒体 {key} 时发生错误: {str(e)}")
+                return None
+            finally:
+                # 下载失败或被取消时删除不完整的临时文件，成功时临时文件已移入缓存
+                self.cache.discard_temp(key)
+
+    async def download_all(self, messages: List) -> List[Optional[str]]:
+        """并发下载多条消息的媒体，返回与输入顺序一致的路径列表"""
+        return await asyncio.gather(*(self.download(message) for message in messages))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass 消息记录
+获取、存储、提示词构建和导出共用的紧凑消息表示
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+
+class MessageRecord:
+    """
+    单条频道消息
+
+    使用 __slots__ 避免每条消息一个实例字典，日期保存为 datetime 而不是ISO字符串，
+    大批量回填和跨频道处理时内存占用明显低于普通字典。
+    """
+
+    __slots__ = ('id', 'date', 'text', 'views', 'forwards', 'replies',
+                 'has_media', 'media_type', 'media_path')
+
+    def __init__(self, id: int, date: datetime, text: str, views: Optional[int] = 0,
+                 forwards: Optional[int] = 0, replies: int = 0, has_media: bool = False,
+                 media_type: Optional[str] = None, media_path: Optional[str] = None):
+        self.id = id
+        self.date = date
+        self.text = text
+        self.views = views
+        self.forwards = forwards
+        self.replies = replies
+        self.has_media = has_media
+        self.media_type = media_type
+        self.media_path = media_path
+
+    def __repr__(self) -> str:
+        return f"MessageRecord(id={self.id}, date={self.date.isoformat()})"
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'MessageRecord':
+        """从导出格式的字典创建"""
+        return cls(
+            id=data['id'],
+            date=datetime.fromisoformat(data['date']),
+            text=data.get('text') or '',
+            views=data.get('views', 0),
+            forwards=data.get('forwards', 0),
+            replies=data.get('replies', 0),
+            has_media=data.get('has_media', False),
+            media_type=data.get('media_type'),
+            media_path=data.get('media_path')
+        )
+
+    def to_dict(self) -> Dict:
+        """转换为导出格式的字典"""
+        data = {
+            'id': self.id,
+            'date': self.date.isoformat(),
+            'text': self.text,
+            'views': self.views,
+            'forwards': self.forwards,
+            'replies': self.replies,
+            'has_media': self.has_media,
+            'media_type': self.media_type
+        }
+        if self.media_path is not None:
+            data['media_path'] = self.media_path
+        return data
+
+    def to_json(self) -> str:
+        """直接序列化为单行JSON，不经过中间字典"""
+        dumps = json.dumps
+        line = (
+            f'{{"id": {self.id}, "date": "{self.date.isoformat()}", '
+            f'"text": {dumps(self.text, ensure_ascii=False)}, '
+            f'"views": {dumps(self.views)}, "forwards": {dumps(self.forwards)}, '
+            f'"replies": {dumps(self.replies)}, "has_media": {dumps(self.has_media)}, '
+            f'"media_type": {dumps(self.media_type)}'
+        )
+        if self.media_path is not None:
+            line += f', "media_path": {dumps(self.media_path, ensure_ascii=False)}'
+        return line + '}'
+
+    @classmethod
+    def from_json(cls, line: str) -> 'MessageRecord':
+        """从单行JSON创建"""
+        return cls.from_dict(json.loads(line))
+
+
+def iter_json_array(records: Iterable[MessageRecord], batch_size: int = 1000,
+                    max_chars: int = 1024 * 1024) -> Iterator[str]:
+    """
+    分批生成JSON数组的文本片段
+
+    每批最多 batch_size 条记录或约 max_chars 个字符，导出时不需要先拼接整个文件，
+    也不会每条记录写入一次。
+    """
+    parts = ['[']
+    size = 0
+    for i, record in enumerate(records):
+        part = ('\n  ' if i == 0 else ',\n  ') + record.to_json()
+        parts.append(part)
+        size += len(part)
+        if len(parts) >= batch_size or size >= max_chars:
+            yield ''.join(parts)
+            parts = []
+            size = 0
+    parts.append('\n]')
+    yield ''.join(parts)
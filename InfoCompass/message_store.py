@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass 消息存储
+按频道追加写入的本地消息历史 (JSON Lines)
+"""
+
+import asyncio
+import os
+import logging
+from typing import Dict, List
+
+import aiofiles
+
+from message_record import MessageRecord
+
+logger = logging.getLogger(__name__)
+
+
+class MessageStore:
+    """本地消息历史存储，每个频道一个JSON Lines文件"""
+
+    def __init__(self, data_dir: str):
+        """
+        初始化消息存储
+
+        Args:
+            data_dir: 数据目录，历史文件保存在其下的 store 子目录
+        """
+        self.store_dir = os.path.join(data_dir, 'store')
+        os.makedirs(self.store_dir, exist_ok=True)
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def path(self, channel_name: str) -> str:
+        """频道历史文件路径"""
+        return os.path.join(self.store_dir, f"{channel_name}.jsonl")
+
+    def _lock(self, channel_name: str) -> asyncio.Lock:
+        lock = self._locks.get(channel_name)
+        if lock is None:
+            lock = self._locks[channel_name] = asyncio.Lock()
+        return lock
+
+    async def append(self, channel_name: str, messages: List[MessageRecord]):
+        """
+        追加消息到频道历史
+
+        同一频道的并发写入会串行执行；重复的消息ID在读取时去重。
+        """
+        if not messages:
+            return
+
+        lines = "".join(msg.to_json() + "\n" for msg in messages)
+        async with self._lock(channel_name):
+            async with aiofiles.open(self.path(channel_name), 'a', encoding='utf-8') as f:
+                await f.write(lines)
+
+    async def load(self, channel_name: str) -> List[MessageRecord]:
+        """
+        读取频道历史
+
+        Returns:
+            按消息ID升序排列、去重后的消息列表
+        """
+        path = self.path(channel_name)
+        if not os.path.exists(path):
+            return []
+
+        messages = {}
+        async with aiofiles.open(path, 'r', encoding='utf-8') as f:
+            async for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    msg = MessageRecord.from_json(line)
+                except ValueError:
+                    # 中断的写入可能留下不完整的最后一行
+                    logger.warning(f"忽略损坏的历史记录: {path}")
+                    continue
+                messages[msg.id] = msg
+
+        return [messages[msg_id] for msg_id in sorted(messages)]
+
+    async def load_recent(self, channel_name: str, count: int, block_size: int = 64 * 1024) -> List[MessageRecord]:
+        """
+        读取频道历史中最近写入的消息
+
+        从文件末尾向前分块读取，取到 count 条不重复的消息即停止，不加载整个历史。
+
+        Returns:
+            按消息ID升序排列、去重后的消息列表
+        """
+        path = self.path(channel_name)
+        if count <= 0 or not os.path.exists(path):
+            return []
+
+        messages = {}
+        async with aiofiles.open(path, 'rb') as f:
+            position = await f.seek(0, os.SEEK_END)
+            tail = b''
+            while position > 0 and len(messages) < count:
+                size = min(block_size, position)
+                position -= size
+                await f.seek(position)
+                lines = (await f.read(size) + tail).split(b'\n')
+                # 第一行可能不完整，留到读取前一块时拼接
+                tail = lines.pop(0) if position > 0 else b''
+                for line in reversed(lines):
+                    if len(messages) >= count:
+                        break
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        msg = MessageRecord.from_json(line.decode('utf-8'))
+                    except ValueError:
+                        logger.warning(f"忽略损坏的历史记录: {path}")
+                        continue
+                    messages.setdefault(msg.id, msg)
+
+        return [messages[msg_id] for msg_id in sorted(messages)]
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass 模型路由
+根据提示词规模、期望输出长度和频道配置为每次请求选择模型
+"""
+
+import os
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelTier:
+    """模型档位"""
+    name: str
+    model_name: str
+    context_window: int
+    max_output_tokens: int
+
+
+# 默认档位，按容量从小到大排列
+DEFAULT_TIERS = [
+    ModelTier('lite', 'gemini-2.0-flash-lite', 32000, 2048),
+    ModelTier('standard', 'gemini-2.0-flash', 1000000, 8192),
+    ModelTier('large', 'gemini-1.5-pro', 2000000, 8192),
+]
+
+# 未指定输出长度时预留的输出token数
+DEFAULT_OUTPUT_TOKENS = 1024
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的token数量
+
+    ASCII字符约4个一个token，中文等非ASCII字符约1个一个token。
+    只用于路由决策，不需要精确值，避免每次请求都调用远程计数接口。
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+class ModelBackend(ABC):
+    """模型后端接口，新的后端需要实现 generate"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def count_tokens(self, text: str) -> int:
+        """统计token数量"""
+        return estimate_tokens(text)
+
+    @abstractmethod
+    def generate(self, prompt: str, max_output_tokens: Optional[int] = None) -> str:
+        """生成文本"""
+
+
+class GeminiBackend(ModelBackend):
+    """Gemini API后端"""
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str, max_output_tokens: Optional[int] = None) -> str:
+        generation_config = {'max_output_tokens': max_output_tokens} if max_output_tokens else None
+        response = self.model.generate_content(prompt, generation_config=generation_config)
+        return response.text
+
+
+class LocalBackend(ModelBackend):
+    """
+    本地替身模型
+
+    不访问网络，直接从提示词中抽取前若干行作为"总结"，
+    用于离线测试和基准测试。
+    """
+
+    def __init__(self, model_name: str, max_lines: int = 20):
+        super().__init__(model_name)
+        self.max_lines = max_lines
+
+    def generate(self, prompt: str, max_output_tokens: Optional[int] = None) -> str:
+        lines = [line.strip() for line in prompt.splitlines() if line.strip()]
+        summary = "\n".join(f"- {line}" for line in lines[:self.max_lines])
+        if max_output_tokens:
+            # 按输出上限截断，粗略对应每token 1个字符
+            summary = summary[:max_output_tokens]
+        return f"[{self.model_name}] 本地总结\n\n{summary}"
+
+
+# 后端注册表，可通过 register_backend 接入其他实现
+BACKENDS: Dict[str, Callable[[str], ModelBackend]] = {
+    'gemini': GeminiBackend,
+    'local': LocalBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[[str], ModelBackend]):
+    """注册模型后端"""
+    BACKENDS[name] = factory
+
+
+def parse_tiers(tiers_str: str) -> List[ModelTier]:
+    """
+    解析档位配置
+
+    格式: 名称=模型:上下文窗口:最大输出,... 例如
+    lite=gemini-2.0-flash-lite:32000:2048,standard=gemini-2.0-flash:1000000:8192
+    """
+    tiers = []
+    for item in tiers_str.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            name, spec = item.split('=', 1)
+            model_name, context_window, max_output = spec.rsplit(':', 2)
+            tiers.append(ModelTier(name.strip(), model_name.strip(), int(context_window), int(max_output)))
+        except ValueError:
+            logger.warning(f"忽略无效的模型档位配置: {item}")
+    return sorted(tiers, key=lambda tier: tier.context_window)
+
+
+def parse_channel_tiers(channel_tiers_str: str) -> Dict[str, str]:
+    """解析频道档位配置，格式: @channel1=standard,@channel2=lite"""
+    channel_tiers = {}
+    for item in channel_tiers_str.split(','):
+        if '=' not in item:
+            continue
+        channel, tier_name = item.split('=', 1)
+        channel_tiers[channel.strip()] = tier_name.strip()
+    return channel_tiers
+
+
+class ModelRouter:
+    """模型路由器 - 为每次请求选择合适的模型档位"""
+
+    def __init__(self, tiers: Optional[List[ModelTier]] = None, backend: str = 'gemini',
+                 channel_tiers: Optional[Dict[str, str]] = None):
+        """
+        初始化模型路由器
+
+        Args:
+            tiers: 模型档位列表，按容量从小到大排列
+            backend: 后端名称 (gemini / local 或已注册的其他后端)
+            channel_tiers: 频道最低档位配置 {频道: 档位名称}
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"未知的模型后端: {backend}")
+
+        self.tiers = tiers or list(DEFAULT_TIERS)
+        self.backend_name = backend
+        self.channel_tiers = channel_tiers or {}
+        self._backends: Dict[str, ModelBackend] = {}
+
+    @classmethod
+    def from_env(cls) -> 'ModelRouter':
+        """从环境变量创建路由器"""
+        tiers = parse_tiers(os.getenv('GEMINI_MODEL_TIERS', ''))
+        channel_tiers = parse_channel_tiers(os.getenv('CHANNEL_MODEL_TIERS', ''))
+        backend = os.getenv('MODEL_BACKEND', 'gemini').strip() or 'gemini'
+        return cls(tiers=tiers or None, backend=backend, channel_tiers=channel_tiers)
+
+    def _tier_index(self, tier_name: str) -> int:
+        for i, tier in enumerate(self.tiers):
+            if tier.name == tier_name:
+                return i
+        logger.warning(f"未知的模型档位: {tier_name}，使用最小档位")
+        return 0
+
+    def select(self, prompt_tokens: int, output_tokens: Optional[int] = None,
+               channel: Optional[str] = None) -> ModelTier:
+        """
+        选择模型档位
+
+        从频道配置的最低档位开始，选择第一个能容纳提示词和期望输出的档位；
+        都容纳不下时使用最大档位。
+        """
+        output_tokens = output_tokens or DEFAULT_OUTPUT_TOKENS
+        start = self._tier_index(self.channel_tiers[channel]) if channel in self.channel_tiers else 0
+
+        for tier in self.tiers[start:]:
+            if (prompt_tokens + output_tokens <= tier.context_window
+                    and output_tokens <= tier.max_output_tokens):
+                return tier
+
+        logger.warning(f"提示词过长 ({prompt_tokens} tokens)，使用最大档位 {self.tiers[-1].name}")
+        return self.tiers[-1]
+
+    def get_backend(self, tier: ModelTier) -> ModelBackend:
+        """获取档位对应的模型后端，同一模型只创建一次"""
+        backend = self._backends.get(tier.model_name)
+        if backend is None:
+            backend = BACKENDS[self.backend_name](tier.model_name)
+            self._backends[tier.model_name] = backend
+        return backend
+
+    def route(self, prompt: str, output_tokens: Optional[int] = None,
+              channel: Optional[str] = None) -> Tuple[ModelTier, ModelBackend]:
+        """为提示词选择档位并返回对应的后端"""
+        prompt_tokens = estimate_tokens(prompt)
+        tier = self.select(prompt_tokens, output_tokens, channel)
+        logger.info(f"模型路由: {prompt_tokens} tokens -> {tier.name} ({tier.model_name})")
+        return tier, self.get_backend(tier)
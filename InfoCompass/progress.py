@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass 控制台输出
+逐行输出处理进度，或在安静/批量模式下原地重绘一张进度表；
+输出经日志队列由后台线程写出，不在事件循环中阻塞
+"""
+
+import re
+import sys
+import time
+import unicodedata
+from typing import Dict, List
+
+from log_setup import console_write, flush_console
+
+# 状态文字前的表情和空白
+_LEADING_SYMBOLS = re.compile(r'^\W+')
+
+
+def _display_width(text: str) -> int:
+    """终端显示宽度，中文等全角字符占两列"""
+    return sum(2 if unicodedata.east_asian_width(ch) in ('W', 'F') else 1 for ch in text)
+
+
+def _pad(text: str, width: int) -> str:
+    return text + ' ' * max(0, width - _display_width(text))
+
+
+class ConsoleReporter:
+    """逐行输出处理进度"""
+
+    def stage(self, channel: str, text: str, **fields):
+        """
+        报告频道的处理阶段
+
+        Args:
+            channel: 频道用户名
+            text: 阶段说明
+            fields: 附加字段，例如 messages=消息数
+        """
+        console_write(text + '\n')
+
+    def detail(self, text: str):
+        """输出详细内容，例如总结预览"""
+        console_write(text + '\n')
+
+    def close(self):
+        """结束输出，等待已提交的内容写出"""
+        flush_console()
+
+
+class ProgressTable(ConsoleReporter):
+    """
+    进度表
+
+    每个频道一行，状态变化时原地重绘整张表而不是追加新行。
+    重绘有最小间隔，非终端输出时只在结束时输出一次。
+    """
+
+    COLUMNS = [('频道', 'channel'), ('状态', 'status'), ('消息', 'messages'), ('耗时', 'elapsed')]
+
+    def __init__(self, stream=None, min_interval: float = 0.2):
+        """
+        初始化进度表
+
+        Args:
+            stream: 输出流，为空时经后台线程写到标准输出
+            min_interval: 最小重绘间隔 (秒)
+        """
+        self.stream = stream or sys.stdout
+        self._write = self._write_stream if stream else console_write
+        self.min_interval = min_interval
+        self.interactive = self.stream.isatty()
+        self.rows: Dict[str, Dict] = {}
+        self._started: Dict[str, float] = {}
+        self._drawn_lines = 0
+        self._last_draw = 0.0
+
+    def stage(self, channel: str, text: str, **fields):
+        row = self.rows.setdefault(channel, {'channel': channel, 'messages': '-'})
+        self._started.setdefault(channel, time.monotonic())
+        row['status'] = _LEADING_SYMBOLS.sub('', text).strip()
+        row['elapsed'] = f"{time.monotonic() - self._started[channel]:.1f}s"
+        row.update({key: str(value) for key, value in fields.items()})
+        self._render()
+
+    def detail(self, text: str):
+        """进度表模式下不输出详细内容"""
+
+    def close(self):
+        self._render(force=True)
+        flush_console()
+
+    def _write_stream(self, text: str):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def _lines(self) -> List[str]:
+        widths = [
+            max([_display_width(title)] + [_display_width(row.get(key, '')) for row in self.rows.values()])
+            for title, key in self.COLUMNS
+        ]
+        lines = ['  '.join(_pad(title, width) for (title, _), width in zip(self.COLUMNS, widths))]
+        lines.append('  '.join('-' * width for width in widths))
+        for row in self.rows.values():
+            lines.append('  '.join(_pad(row.get(key, ''), width) for (_, key), width in zip(self.COLUMNS, widths)))
+        return lines
+
+    def _render(self, force: bool = False):
+        now = time.monotonic()
+        if not force and (not self.interactive or now - self._last_draw < self.min_interval):
+            return
+        self._last_draw = now
+
+        lines = self._lines()
+        output = ''
+        if self.interactive and self._drawn_lines:
+            # 光标回到表格起始行并清除到屏幕末尾
+            output = f"\x1b[{self._drawn_lines}F\x1b[J"
+        output += '\n'.join(lines) + '\n'
+        self._write(output)
+        self._drawn_lines = len(lines)
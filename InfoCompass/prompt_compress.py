@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass 提示词压缩
+去除频道消息中重复的签名、订阅链接、标签块、表情和跟踪链接，减少发送给模型的token
+"""
+
+import re
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, List, Set
+from urllib.parse import urlsplit
+
+from message_record import MessageRecord
+from model_router import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+URL_PATTERN = re.compile(r'https?://[^\s<>()\[\]]+')
+HASHTAG_LINE_PATTERN = re.compile(r'^(?:[#＃]\w+[\s,，]*)+$')
+HASHTAG_PATTERN = re.compile(r'[#＃]\w+')
+EMOJI = (
+    '\U0001F000-\U0001FAFF'  # 表情、符号、旗帜等
+    '\u2600-\u27BF'          # 杂项符号和装饰符号
+    '\u2B00-\u2BFF'          # 箭头和星形等
+    '\uFE0F\u200D'           # 变体选择符和零宽连接符
+)
+EMOJI_RUN_PATTERN = re.compile(f'([{EMOJI}])[{EMOJI}\\s]*[{EMOJI}]')
+SPACES_PATTERN = re.compile(r'[ \t\u00A0\u3000]+')
+
+
+@dataclass
+class CompressionStats:
+    """压缩前后的规模"""
+    chars_before: int = 0
+    chars_after: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+    boilerplate_lines: int = 0
+
+    def __str__(self) -> str:
+        return (f"字符 {self.chars_before} -> {self.chars_after}，"
+                f"tokens {self.tokens_before} -> {self.tokens_after}，"
+                f"样板行 {self.boilerplate_lines} 种")
+
+
+def shorten_url(match) -> str:
+    """将链接缩短为域名，去除跟踪参数等无助于总结的部分"""
+    host = urlsplit(match.group(0)).hostname or ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def normalize_line(line: str, max_hashtags: int = 3) -> str:
+    """压缩单行文本：缩短链接、合并表情和空白，纯标签行最多保留 max_hashtags 个标签"""
+    line = URL_PATTERN.sub(shorten_url, line)
+    line = EMOJI_RUN_PATTERN.sub(r'\1', line)
+    line = SPACES_PATTERN.sub(' ', line).strip()
+    if HASHTAG_LINE_PATTERN.match(line):
+        line = ' '.join(HASHTAG_PATTERN.findall(line)[:max_hashtags])
+    return line
+
+
+def compact_date(date: datetime) -> str:
+    """紧凑的本地时间表示，例如 06-13 18:30"""
+    return date.astimezone().strftime('%m-%d %H:%M')
+
+
+def learn_boilerplate(texts: Iterable[str], min_ratio: float = 0.1, min_count: int = 3) -> Set[str]:
+    """
+    学习频道的样板行
+
+    同一行 (压缩后) 出现在至少 min_ratio 比例且不少于 min_count 条消息中时视为样板，
+    例如频道签名、订阅引导和固定的联系方式。
+    """
+    counts = Counter()
+    total = 0
+    for text in texts:
+        total += 1
+        counts.update({normalize_line(line) for line in text.splitlines()} - {''})
+
+    threshold = max(min_count, min_ratio * total)
+    return {line for line, count in counts.items() if count >= threshold}
+
+
+class PromptCompressor:
+    """按频道学习样板行并压缩消息文本"""
+
+    def __init__(self, boilerplate: Set[str], max_hashtags: int = 3):
+        """
+        初始化压缩器
+
+        Args:
+            boilerplate: 需要去除的样板行 (压缩后的形式)
+            max_hashtags: 纯标签行最多保留的标签数
+        """
+        self.boilerplate = boilerplate
+        self.max_hashtags = max_hashtags
+
+    def compress_text(self, text: str) -> str:
+        """
+        压缩单条消息文本
+
+        整条消息都由样板行组成时保留这些行，避免固定格式的正文被误删。
+        """
+        lines = [normalize_line(line, self.max_hashtags) for line in text.splitlines()]
+        lines = [line for line in lines if line]
+        content = [line for line in lines if line not in self.boilerplate]
+        return '\n'.join(content or lines)
+
+    def compress_messages(self, messages: List[MessageRecord]) -> List[MessageRecord]:
+        """
+        压缩消息列表
+
+        Returns:
+            只含ID、时间和压缩后文本的新消息记录，压缩后为空的消息被去除
+        """
+        compressed = []
+        for msg in messages:
+            if not msg.text:
+                continue
+            text = self.compress_text(msg.text)
+            if text:
+                compressed.append(MessageRecord(msg.id, msg.date, text))
+        return compressed
+
+
+def measure(texts: Iterable[str]):
+    """统计文本的字符数和估算token数"""
+    chars = tokens = 0
+    for text in texts:
+        chars += len(text)
+        tokens += estimate_tokens(text)
+    return chars, tokens
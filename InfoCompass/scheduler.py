@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass 自适应调度
+根据每个频道的发帖频率安排轮询间隔：活跃频道频繁轮询，冷清频道少轮询
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import aiofiles
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import InfoCompass
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveScheduler:
+    """按频道发帖频率自适应调整轮询间隔的调度器"""
+
+    def __init__(self, compass: InfoCompass, target_messages: int = 20,
+                 min_interval: float = 15, max_interval: float = 24 * 60,
+                 lookback_days: int = 14, smoothing: float = 0.3):
+        """
+        初始化调度器
+
+        Args:
+            compass: InfoCompass实例
+            target_messages: 期望每次轮询获取的消息数
+            min_interval: 最短轮询间隔 (分钟)
+            max_interval: 最长轮询间隔 (分钟)
+            lookback_days: 从历史估算发帖频率时使用的天数
+            smoothing: 每次轮询后更新频率的平滑系数 (0-1)，越大越偏向最近的观测
+        """
+        self.compass = compass
+        self.target_messages = target_messages
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.lookback_days = lookback_days
+        self.smoothing = smoothing
+        self.state_path = os.path.join(compass.data_dir, 'scheduler.json')
+        # 频道 -> {'rate': 每小时消息数, 'last_poll': 时间戳, 'last_success': 最近一次成功轮询的时间戳,
+        #         'next_poll': 时间戳}
+        self.state: Dict[str, Dict] = {}
+
+    async def load_state(self):
+        """读取已学习的频率和下次轮询时间"""
+        if os.path.exists(self.state_path):
+            async with aiofiles.open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.loads(await f.read())
+
+        now = time.time()
+        for channel in self.compass.channels:
+            if channel not in self.state:
+                rate = await self.estimate_rate(channel)
+                self.state[channel] = {'rate': rate, 'last_poll': None, 'next_poll': now}
+                logger.info(f"频道 {channel} 历史发帖频率: {rate:.2f} 条/小时")
+
+    async def save_state(self):
+        tmp_path = self.state_path + '.tmp'
+        async with aiofiles.open(tmp_path, 'w', encoding='utf-8') as f:
+            await f.write(json.dumps(self.state, ensure_ascii=False, indent=2))
+        os.replace(tmp_path, self.state_path)
+
+    async def estimate_rate(self, channel: str) -> float:
+        """从本地消息历史估算频道的发帖频率 (条/小时)"""
+        channel_name = channel.replace('@', '').replace('/', '_')
+        messages = await self.compass.message_store.load(channel_name)
+        if not messages:
+            return 0.0
+
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(days=self.lookback_days)
+        dates = [msg.date for msg in messages]
+        recent = [date for date in dates if date >= since]
+        # 历史不足回看天数时按实际覆盖的时长计算
+        span_hours = max(1.0, (now - max(since, min(dates))).total_seconds() / 3600)
+        return len(recent) / span_hours
+
+    def interval_minutes(self, channel: str) -> float:
+        """
+        计算频道的轮询间隔
+
+        间隔为获取约 target_messages 条新消息所需的时间，优先级每高一级间隔减半，
+        每低一级间隔加倍，最后限制在频道或全局配置的范围内。
+        """
+        config = self.compass.get_channel_config(channel)
+        rate = self.state[channel]['rate']
+        interval = self.target_messages / rate * 60 if rate > 0 else self.max_interval
+        interval *= 2.0 ** -config.priority
+
+        low = config.min_interval or self.min_interval
+        high = config.max_interval or self.max_interval
+        return min(max(interval, low), high)
+
+    def due_channels(self) -> List[str]:
+        """已到轮询时间的频道，按优先级从高到低排列"""
+        now = time.time()
+        due = [channel for channel in self.compass.channels if self.state[channel]['next_poll'] <= now]
+        return sorted(due, key=lambda ch: (-self.compass.get_channel_config(ch).priority, self.state[ch]['next_poll']))
+
+    async def poll(self, channel: str):
+        """轮询单个频道并根据新消息数更新发帖频率"""
+        days_back = self.compass.get_channel_config(channel).days_back or 1
+        entry = self.state[channel]
+        now = time.time()
+
+        # 轮询间隔可能超过获取的时间窗口，完整重新生成时从上一次成功轮询的时间开始获取，
+        # 避免两次轮询之间、时间窗口之前发布的消息被漏掉
+        since = None
+        if entry.get('last_success'):
+            window_start = now - days_back * 86400
+            since = datetime.fromtimestamp(min(entry['last_success'], window_start), timezone.utc)
+
+        try:
+            # 消息上限、天数和提示词由 process_channel 按频道配置合并
+            result = await self.compass.process_channel(
+                channel_username=channel,
+                days_back=days_back,
+                incremental=True,
+                since=since
+            )
+        except Exception as e:
+            logger.error(f"轮询频道 {channel} 时发生错误: {str(e)}")
+            result = None
+
+        new_messages = None
+        if result is not None:
+            entry['last_success'] = now
+            # 只用上一次总结之后的新消息数，完整重新生成时的消息数覆盖整个时间窗口
+            new_messages = result.get('new_message_count', 0)
+            if new_messages is not None and entry['last_poll']:
+                elapsed_hours = max((now - entry['last_poll']) / 3600, 1 / 60)
+                observed = new_messages / elapsed_hours
+                entry['rate'] = self.smoothing * observed + (1 - self.smoothing) * entry['rate']
+            else:
+                # 首次轮询或没有上一次总结可比较，用刚写入的历史重新估算
+                entry['rate'] = await self.estimate_rate(channel)
+
+        entry['last_poll'] = now
+        interval = self.interval_minutes(channel)
+        entry['next_poll'] = now + interval * 60
+        logger.info(f"频道 {channel}: 新消息 {'-' if new_messages is None else new_messages}，频率 {entry['rate']:.2f} 条/小时，"
+                    f"{interval:.0f} 分钟后再次轮询")
+        await self.save_state()
+
+    async def run_once(self):
+        """轮询所有已到时间的频道"""
+        await self.load_state()
+        for channel in self.due_channels():
+            await self.poll(channel)
+
+    async def run_forever(self):
+        """持续运行，等待到最早的轮询时间后处理到期频道"""
+        await self.load_state()
+        while True:
+            due = self.due_channels()
+            if not due:
+                next_poll = min(self.state[ch]['next_poll'] for ch in self.compass.channels)
+                await asyncio.sleep(max(1.0, next_poll - time.time()))
+                continue
+            await self.poll(due[0])
+
+    def print_schedule(self):
+        """打印各频道的调度情况"""
+        print(f"{'频道':<24}{'优先级':>6}{'频率(条/小时)':>14}{'间隔(分钟)':>12}  下次轮询")
+        for channel in self.compass.channels:
+            entry = self.state[channel]
+            next_poll = datetime.fromtimestamp(entry['next_poll']).strftime('%Y-%m-%d %H:%M')
+            print(f"{channel:<24}{self.compass.get_channel_config(channel).priority:>6}"
+                  f"{entry['rate']:>14.2f}{self.interval_minutes(channel):>12.0f}  {next_poll}")
+
+
+async def run_scheduler():
+    """运行调度器"""
+    parser = argparse.ArgumentParser(
+        description="InfoCompass - 按频道活跃度自适应轮询",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  python scheduler.py              持续运行
+  python scheduler.py --once       轮询当前到期的频道后退出 (适合cron)
+  python scheduler.py --show       查看各频道的发帖频率和轮询计划
+        """
+    )
+    parser.add_argument('--once', action='store_true', help='轮询当前到期的频道后退出')
+    parser.add_argument('--show', action='store_true', help='只显示调度计划，不轮询')
+    parser.add_argument('--target', type=int, default=20, help='期望每次轮询获取的消息数 (默认: 20)')
+    parser.add_argument('--min-interval', type=float, default=15, help='最短轮询间隔，分钟 (默认: 15)')
+    parser.add_argument('--max-interval', type=float, default=24 * 60, help='最长轮询间隔，分钟 (默认: 1440)')
+    args = parser.parse_args()
+
+    compass = InfoCompass()
+    if not compass.channels:
+        print("❌ 请在.env文件或频道配置文件中配置频道")
+        return
+
+    scheduler = AdaptiveScheduler(
+        compass,
+        target_messages=args.target,
+        min_interval=args.min_interval,
+        max_interval=args.max_interval
+    )
+
+    try:
+        if args.show:
+            await scheduler.load_state()
+            scheduler.print_schedule()
+        elif args.once:
+            await scheduler.run_once()
+        else:
+            print("🧭 InfoCompass 自适应调度已启动")
+            await scheduler.run_forever()
+    finally:
+        if compass.telegram_client.is_connected():
+            await compass.telegram_client.disconnect()
+
+
+def main():
+    """主函数"""
+    try:
+        asyncio.run(run_scheduler())
+    except KeyboardInterrupt:
+        print("\n\n👋 调度已停止")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass HTTP服务
+从本地存储提供频道总结、消息和运行状态，供其他服务调用
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import sys
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import InfoCompass
+
+logger = logging.getLogger(__name__)
+
+STATUS_TEXT = {
+    200: 'OK',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    409: 'Conflict',
+    500: 'Internal Server Error',
+}
+
+
+class HTTPError(Exception):
+    """带状态码的请求错误"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class InfoCompassServer:
+    """基于asyncio的轻量HTTP服务"""
+
+    def __init__(self, compass: InfoCompass):
+        self.compass = compass
+        self.started_at = datetime.now().isoformat()
+        # 正在进行的刷新任务及其参数，同一频道相同参数的并发刷新请求共享一个任务
+        self._refreshes: Dict[str, Tuple[Tuple, asyncio.Task]] = {}
+        # 每个频道最近一次刷新的状态
+        self._status: Dict[str, Dict] = {}
+        # 文件读取缓存: 路径 -> (mtime, size, 内容)
+        self._file_cache: Dict[str, Tuple[float, int, object]] = {}
+
+    @staticmethod
+    def channel_name(channel: str) -> str:
+        """将频道用户名转换为文件名中使用的名称"""
+        return channel.replace('@', '').replace('/', '_')
+
+    def _latest_summary_path(self, channel_name: str) -> Optional[str]:
+        """最新的总结文件，文件名中的时间戳可直接按字符串排序"""
+        paths = glob.glob(os.path.join(glob.escape(self.compass.data_dir), f"{glob.escape(channel_name)}_summary_*.md"))
+        return max(paths) if paths else None
+
+    async def _read_cached(self, path: str, loader):
+        """读取文件内容，文件未修改时直接返回缓存"""
+        stat = os.stat(path)
+        cached = self._file_cache.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+        value = await loader(path)
+        self._file_cache[path] = (stat.st_mtime, stat.st_size, value)
+        return value
+
+    async def _load_summary(self, path: str) -> Dict:
+        def read():
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        content = await asyncio.to_thread(read)
+        return {'file': path, 'content': content}
+
+    async def handle_summary(self, channel: str, query: Dict) -> Dict:
+        channel_name = self.channel_name(channel)
+        path = self._latest_summary_path(channel_name)
+        if not path:
+            raise HTTPError(404, f"频道 {channel} 暂无总结")
+        summary = await self._read_cached(path, self._load_summary)
+        return {'channel': channel, **summary}
+
+    async def handle_messages(self, channel: str, query: Dict) -> Dict:
+        channel_name = self.channel_name(channel)
+        path = self.compass.message_store.path(channel_name)
+        if not os.path.exists(path):
+            raise HTTPError(404, f"频道 {channel} 暂无消息记录")
+
+        try:
+            min_id = int(query.get('min_id', 0))
+            max_id = int(query['max_id']) if 'max_id' in query else None
+            limit = int(query.get('limit', 100))
+        except ValueError:
+            raise HTTPError(400, "min_id、max_id 和 limit 必须是整数")
+
+        async def load(_):
+            return await self.compass.message_store.load(channel_name)
+        messages = await self._read_cached(path, load)
+
+        selected = [
+            msg for msg in messages
+            if msg.id > min_id and (max_id is None or msg.id < max_id)
+        ]
+        # 返回范围内最新的 limit 条
+        selected = selected[-limit:] if limit > 0 else selected
+        return {'channel': channel, 'count': len(selected), 'messages': [msg.to_dict() for msg in selected]}
+
+    async def handle_status(self, query: Dict) -> Dict:
+        return {
+            'started_at': self.started_at,
+            'channels': self.compass.channels,
+            'refreshing': sorted(self._refreshes),
+            'runs': self._status,
+        }
+
+    async def handle_refresh(self, channel: str, query: Dict) -> Dict:
+        """
+        刷新频道总结
+
+        同一频道正在以相同参数刷新时等待已有任务而不是重复获取；参数不同时返回409，
+        避免同一频道的两次刷新同时写入消息历史和总结状态。
+        """
+        try:
+            limit = int(query.get('limit', 100))
+            days_back = int(query.get('days', 1))
+        except ValueError:
+            raise HTTPError(400, "limit 和 days 必须是整数")
+        incremental = query.get('incremental', '0').lower() in ('1', 'true', 'yes')
+
+        params = (limit, days_back, incremental)
+        running = self._refreshes.get(channel)
+        if running and running[0] != params:
+            raise HTTPError(409, f"频道 {channel} 正在以不同参数刷新 (limit={running[0][0]}, "
+                                 f"days={running[0][1]}, incremental={running[0][2]})，请稍后重试")
+
+        coalesced = running is not None
+        if running:
+            task = running[1]
+        else:
+            task = asyncio.ensure_future(self._refresh(channel, limit, days_back, incremental))
+            self._refreshes[channel] = (params, task)
+            task.add_done_callback(lambda _: self._refreshes.pop(channel, None))
+
+        result = await asyncio.shield(task)
+        return {'channel': channel, 'coalesced': coalesced, **result}
+
+    async def _refresh(self, channel: str, limit: int, days_back: int, incremental: bool) -> Dict:
+        status = {'state': 'running', 'started_at': datetime.now().isoformat()}
+        self._status[channel] = status
+        try:
+            result = await self.compass.process_channel(
+                channel, limit=limit, days_back=days_back, incremental=incremental
+            )
+            status.update(state='done', summary_file=result.get('summary_file'))
+            return {'summary_file': result.get('summary_file'), 'messages_file': result.get('messages_file')}
+        except Exception as e:
+            status.update(state='error', error=str(e))
+            raise HTTPError(500, f"刷新频道 {channel} 失败: {str(e)}")
+        finally:
+            status['finished_at'] = datetime.now().isoformat()
+
+    async def dispatch(self, method: str, path: str, query: Dict) -> Dict:
+        """路由请求"""
+        parts = [unquote(part) for part in path.strip('/').split('/') if part]
+
+        if parts == ['status']:
+            if method != 'GET':
+                raise HTTPError(405, "仅支持GET")
+            return await self.handle_status(query)
+
+        if len(parts) == 3 and parts[0] == 'channels':
+            channel = parts[1] if parts[1].startswith('@') else '@' + parts[1]
+            handlers = {
+                ('GET', 'summary'): self.handle_summary,
+                ('GET', 'messages'): self.handle_messages,
+                ('POST', 'refresh'): self.handle_refresh,
+            }
+            handler = handlers.get((method, parts[2]))
+            if handler:
+                return await handler(channel, query)
+            if parts[2] in ('summary', 'messages', 'refresh'):
+                raise HTTPError(405, f"不支持的请求方法: {method}")
+
+        raise HTTPError(404, f"未知路径: {path}")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理单个HTTP连接 (每个连接一个请求)"""
+        try:
+            request_line = (await reader.readline()).decode('latin-1').strip()
+            if not request_line:
+                return
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1')
+                if line in ('\r\n', '\n', ''):
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            try:
+                method, target, _ = request_line.split(' ', 2)
+                url = urlsplit(target)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                body = await self.dispatch(method.upper(), url.path, query)
+                status = 200
+            except HTTPError as e:
+                status, body = e.status, {'error': str(e)}
+            except ValueError:
+                status, body = 400, {'error': '无效的请求'}
+            except Exception as e:
+                logger.error(f"处理请求时发生错误: {str(e)}")
+                status, body = 500, {'error': str(e)}
+
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+            if status == 200 and headers.get('if-none-match') == etag:
+                status, payload = 304, b''
+
+            response_headers = [
+                f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                "Content-Type: application/json; charset=utf-8",
+                f"Content-Length: {len(payload)}",
+                f"ETag: {etag}",
+                "Connection: close",
+            ]
+            writer.write(("\r\n".join(response_headers) + "\r\n\r\n").encode('latin-1') + payload)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        """启动服务并持续运行"""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        logger.info(f"InfoCompass HTTP服务已启动: http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+async def run_server():
+    """运行HTTP服务"""
+    parser = argparse.ArgumentParser(
+        description="InfoCompass - 本地HTTP服务",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+接口:
+  GET  /status                                  运行状态
+  GET  /channels/<频道>/summary                  最新总结
+  GET  /channels/<频道>/messages?min_id=&max_id=&limit=  消息范围
+  POST /channels/<频道>/refresh?limit=&days=&incremental=  刷新总结
+        """
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080, help='监听端口 (默认: 8080)')
+    args = parser.parse_args()
+
+    compass = InfoCompass()
+    print("🧭 InfoCompass HTTP服务")
+    print(f"🌐 http://{args.host}:{args.port}")
+    try:
+        await InfoCompassServer(compass).serve(args.host, args.port)
+    finally:
+        if compass.telegram_client.is_connected():
+            await compass.telegram_client.disconnect()
+
+
+def main():
+    """主函数"""
+    try:
+        asyncio.run(run_server())
+    except KeyboardInterrupt:
+        print("\n\n👋 服务已停止")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
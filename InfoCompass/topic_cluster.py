@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+InfoCompass 话题聚类
+基于字符n-gram TF-IDF特征的球面K-Means聚类，用于在总结前按话题分组消息
+"""
+
+import math
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, List
+
+import numpy as np
+from scipy import sparse
+
+from message_record import MessageRecord
+
+logger = logging.getLogger(__name__)
+
+# n-gram编码中每个字符占用的位数，Unicode码点最大为0x10FFFF
+_CHAR_BITS = 21
+_CHAR_MASK = (1 << _CHAR_BITS) - 1
+
+
+@dataclass
+class TopicCluster:
+    """话题簇"""
+    label: str
+    size: int
+    samples: List[MessageRecord] = field(default_factory=list)
+
+
+def _decode_ngram(key: int) -> str:
+    """将 vectorize 中编码为整数的n-gram还原为字符串"""
+    chars = []
+    while key:
+        chars.append(chr(key & _CHAR_MASK))
+        key >>= _CHAR_BITS
+    return ''.join(reversed(chars))
+
+
+def _ngram_keys(docs: List[str], min_n: int, max_n: int):
+    """
+    提取一批消息的全部n-gram
+
+    消息拼接为一个码点数组，码点0作为消息之间的分隔符，跨消息的n-gram被丢弃。
+    每个n-gram按字符编码为一个整数 (每字符21位，最多3个字符)，首字符非0，
+    不同长度的n-gram编码后的取值范围互不重叠。
+
+    Returns:
+        (n-gram编码数组, 每个n-gram所在的消息序号)
+    """
+    codes = np.frombuffer('\x00'.join(docs).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    doc_ids = np.repeat(np.arange(len(docs), dtype=np.int32), [len(doc) + 1 for doc in docs])[:len(codes)]
+    separators = codes == 0
+
+    # 预先分配所有n-gram的编码数组，原地移位合并字符，减少临时数组
+    counts = [max(0, len(codes) - n + 1) for n in range(min_n, max_n + 1)]
+    keys = np.empty(sum(counts), dtype=np.uint64)
+    rows = np.empty(sum(counts), dtype=np.int32)
+    invalid = np.empty(sum(counts), dtype=bool)
+    offset = 0
+    for n, count in zip(range(min_n, max_n + 1), counts):
+        key = keys[offset:offset + count]
+        skip = invalid[offset:offset + count]
+        key[:] = codes[:count]
+        skip[:] = separators[:count]
+        for j in range(1, n):
+            key <<= np.uint64(_CHAR_BITS)
+            key |= codes[j:j + count]
+            skip |= separators[j:j + count]
+        rows[offset:offset + count] = doc_ids[:count]
+        offset += count
+    return keys[~invalid], rows[~invalid]
+
+
+def _batches(docs: List[str], batch_chars: int) -> List[List[str]]:
+    """按字符数将消息分批"""
+    batches, batch, size = [], [], 0
+    for doc in docs:
+        batch.append(doc)
+        size += len(doc) + 1
+        if size >= batch_chars:
+            batches.append(batch)
+            batch, size = [], 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def vectorize(texts: List[str], ngram_range=(2, 3), max_features: int = 20000,
+              batch_chars: int = 100000, candidate_factor: int = 10):
+    """
+    构建字符n-gram TF-IDF特征
+
+    字符n-gram不依赖分词，对中英文混合的频道消息同样有效。
+    n-gram用numpy按批提取和计数，不逐字符循环，临时数组的大小只与 batch_chars 有关。
+    第一遍统计各n-gram的出现次数，候选词表超过 max_features × candidate_factor 时
+    只保留出现次数最多的部分 (近似计数)，避免词表随消息量无限增长；
+    最终保留出现次数最多的 max_features 个n-gram，第二遍按词表构建稀疏矩阵。
+
+    Returns:
+        (L2归一化的CSR矩阵, 特征列对应的n-gram列表)
+    """
+    min_n, max_n = ngram_range
+    if not 1 <= min_n <= max_n <= 3:
+        raise ValueError(f"不支持的n-gram范围: {ngram_range}，只支持1-3个字符")
+
+    docs = [' '.join(text.lower().replace('\x00', ' ').split()) for text in texts]
+    batches = _batches(docs, batch_chars)
+    max_candidates = max_features * candidate_factor
+
+    # 第一遍：统计词表和出现次数
+    grams = np.empty(0, dtype=np.uint64)
+    totals = np.empty(0, dtype=np.int64)
+    for batch in batches:
+        keys, _ = _ngram_keys(batch, min_n, max_n)
+        batch_grams, batch_totals = np.unique(keys, return_counts=True)
+        grams, inverse = np.unique(np.concatenate([grams, batch_grams]), return_inverse=True)
+        totals = np.bincount(inverse.ravel(), weights=np.concatenate([totals, batch_totals])).astype(np.int64)
+        if len(grams) > max_candidates:
+            keep = np.sort(np.argsort(-totals, kind='stable')[:max_candidates])
+            grams, totals = grams[keep], totals[keep]
+    if len(grams) > max_features:
+        grams = grams[np.sort(np.argsort(-totals, kind='stable')[:max_features])]
+
+    # 第二遍：按词表构建词频矩阵，重复的 (消息, n-gram) 在转换为CSR时累加
+    pieces = []
+    for batch in batches:
+        keys, rows = _ngram_keys(batch, min_n, max_n)
+        cols = np.searchsorted(grams, keys)
+        found = cols < len(grams)
+        found[found] = grams[cols[found]] == keys[found]
+        pieces.append(sparse.csr_matrix(
+            (np.ones(int(found.sum()), dtype=np.float32), (rows[found], cols[found])),
+            shape=(len(batch), len(grams))
+        ))
+    tf = sparse.vstack(pieces, format='csr') if pieces else sparse.csr_matrix((0, len(grams)), dtype=np.float32)
+
+    # 亚线性词频和平滑IDF
+    tf.data = 1.0 + np.log(tf.data)
+    df = np.bincount(tf.indices, minlength=tf.shape[1])
+    idf = np.log((1.0 + tf.shape[0]) / (1.0 + df)) + 1.0
+    tfidf = tf @ sparse.diags(idf.astype(np.float32))
+
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    tfidf = sparse.diags(1.0 / norms) @ tfidf
+
+    return tfidf.tocsr(), [_decode_ngram(key) for key in grams.tolist()]
+
+
+def spherical_kmeans(matrix, k: int, iterations: int = 20, seed: int = 0):
+    """
+    球面K-Means聚类 (余弦相似度)
+
+    Returns:
+        (每行的簇编号, 每行与所属簇中心的相似度, 簇中心矩阵)
+    """
+    n = matrix.shape[0]
+    rng = np.random.default_rng(seed)
+
+    # k-means++ 初始化
+    first = rng.integers(n)
+    centers = [matrix[first].toarray().ravel()]
+    closest = np.asarray(matrix @ centers[0]).ravel()
+    for _ in range(1, k):
+        distances = np.clip(1.0 - closest, 0.0, None)
+        total = distances.sum()
+        index = rng.choice(n, p=distances / total) if total > 0 else rng.integers(n)
+        center = matrix[index].toarray().ravel()
+        centers.append(center)
+        closest = np.maximum(closest, np.asarray(matrix @ center).ravel())
+    centroids = np.vstack(centers)
+
+    labels = np.full(n, -1)
+    for _ in range(iterations):
+        similarities = np.asarray(matrix @ centroids.T)
+        new_labels = similarities.argmax(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+        updated = _centroids(matrix, labels, k)
+        empty = ~updated.any(axis=1)
+        centroids = np.where(empty[:, None], centroids, updated)
+
+    similarities = np.asarray(matrix @ centroids.T)
+    labels = similarities.argmax(axis=1)
+    return labels, similarities[np.arange(n), labels], centroids
+
+
+def _centroids(matrix, labels, k: int):
+    """用指示矩阵一次性求各簇归一化后的中心"""
+    n = matrix.shape[0]
+    indicator = sparse.csr_matrix((np.ones(n, dtype=np.float32), (labels, np.arange(n))), shape=(k, n))
+    sums = np.asarray((indicator @ matrix).todense())
+    norms = np.linalg.norm(sums, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return sums / norms
+
+
+def merge_similar(labels, centroids, threshold: float):
+    """
+    合并中心相似度超过阈值的簇
+
+    K-Means的簇数是预先估计的，话题较少时会把同一话题拆成多个簇。
+
+    Returns:
+        (合并后从0开始连续编号的簇编号, 簇数)
+    """
+    k = centroids.shape[0]
+    parent = list(range(k))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    similarities = centroids @ centroids.T
+    for a, b in zip(*np.nonzero(np.triu(similarities, 1) > threshold)):
+        parent[find(a)] = find(b)
+
+    roots = np.array([find(i) for i in range(k)])
+    _, merged = np.unique(roots[labels], return_inverse=True)
+    return merged, int(merged.max()) + 1
+
+
+def cluster_messages(messages: List[MessageRecord], max_clusters: int = 12, max_samples: int = 15,
+                     label_terms: int = 3, merge_threshold: float = 0.5) -> List[TopicCluster]:
+    """
+    按话题对消息聚类
+
+    Args:
+        messages: 消息列表
+        max_clusters: 最大簇数
+        max_samples: 每个簇最多保留的代表消息数
+        label_terms: 簇标签使用的n-gram数量
+        merge_threshold: 簇中心余弦相似度超过该值时合并
+
+    Returns:
+        按簇大小降序排列的话题簇列表，簇内代表消息按时间排序
+    """
+    messages = [msg for msg in messages if msg.text]
+    if not messages:
+        return []
+
+    matrix, terms = vectorize([msg.text for msg in messages])
+    k = max(1, min(max_clusters, int(math.sqrt(len(messages) / 2)), len(messages)))
+    labels, _, centroids = spherical_kmeans(matrix, k)
+    labels, k = merge_similar(labels, centroids, merge_threshold)
+    centroids = _centroids(matrix, labels, k)
+    # 与所属簇中心的余弦相似度，只计算 n × k 的相似度矩阵，不展开 n × 特征数 的稠密数组
+    similarities = np.asarray(matrix @ centroids.T)
+    scores = similarities[np.arange(len(messages)), labels]
+
+    clusters = []
+    for cluster_id in range(k):
+        members = np.flatnonzero(labels == cluster_id)
+        if members.size == 0:
+            continue
+
+        # 与簇中心最相近的消息作为代表
+        representatives = members[np.argsort(-scores[members])[:max_samples]]
+        samples = sorted((messages[i] for i in representatives), key=lambda msg: msg.date)
+
+        # 权重最高且不含空白的n-gram作为标签
+        label_parts = []
+        for i in np.argsort(-centroids[cluster_id]):
+            if len(label_parts) >= label_terms or centroids[cluster_id][i] <= 0:
+                break
+            if not any(ch.isspace() for ch in terms[i]):
+                label_parts.append(terms[i])
+        label = ' / '.join(label_parts)
+        clusters.append(TopicCluster(label=label or f"话题{cluster_id + 1}", size=int(members.size), samples=samples))
+
+    clusters.sort(key=lambda cluster: cluster.size, reverse=True)
+    logger.info(f"已将 {len(messages)} 条消息聚类为 {len(clusters)} 个话题")
+    return clusters
+
+
+def format_clusters(clusters: List[TopicCluster],
+                    format_date: Callable[[datetime], str] = datetime.isoformat) -> str:
+    """将话题簇格式化为分节的提示词文本"""
+    sections = []
+    for i, cluster in enumerate(clusters, 1):
+        header = f"## 话题{i}: {cluster.label} (共{cluster.size}条消息"
+        if len(cluster.samples) < cluster.size:
+            header += f"，以下为{len(cluster.samples)}条代表性消息"
+        header += ")"
+        body = "\n\n".join(f"({format_date(msg.date)}):\n{msg.text}" for msg in cluster.samples)
+        sections.append(header + "\n\n" + body)
+    return "\n\n".join(sections)
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# 模块以脚本方式互相导入，测试时同样把 InfoCompass 目录加入路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'InfoCompass'))
+
+# 导入 main 时会配置日志文件，测试中写到临时目录
+os.environ.setdefault('LOG_FILE', os.path.join(tempfile.mkdtemp(prefix='infocompass-test-'), 'test.log'))
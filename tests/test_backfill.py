@@ -0,0 +1,134 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import backfill
+from backfill import Backfiller
+from message_record import MessageRecord
+from message_store import MessageStore
+
+
+class Interrupted(Exception):
+    """模拟回填过程中断"""
+
+
+class FakeClient:
+    """按ID从新到旧返回消息的Telegram客户端替身"""
+
+    def __init__(self, top_id, fail_after=None):
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.messages = {}
+        self.fail_after = fail_after
+        self.yielded = 0
+        self.calls = []
+        self.extend(top_id, base)
+
+    def extend(self, top_id, base=datetime(2024, 1, 1, tzinfo=timezone.utc)):
+        for i in range(len(self.messages) + 1, top_id + 1):
+            # 每7条有一条无文字的消息
+            text = '' if i % 7 == 0 else f"消息 {i}"
+            self.messages[i] = SimpleNamespace(id=i, message=text, date=base + timedelta(minutes=i))
+
+    async def get_entity(self, username):
+        return username
+
+    async def get_messages(self, channel, limit=1, offset_date=None):
+        ids = [i for i, msg in self.messages.items() if offset_date is None or msg.date < offset_date]
+        return [self.messages[max(ids)]] if ids else []
+
+    async def iter_messages(self, channel, min_id=0, max_id=0, wait_time=None):
+        self.calls.append((min_id, max_id))
+        for i in sorted(self.messages, reverse=True):
+            if min_id < i < max_id:
+                if self.fail_after is not None and self.yielded >= self.fail_after:
+                    raise Interrupted()
+                self.yielded += 1
+                # 让出控制权，使各区间交替执行
+                await asyncio.sleep(0)
+                yield self.messages[i]
+
+
+def make_backfiller(tmp_path, client, ranges=4, concurrency=4):
+    async def connect():
+        pass
+
+    compass = SimpleNamespace(
+        data_dir=str(tmp_path),
+        telegram_client=client,
+        connect=connect,
+        _build_message_record=lambda msg: MessageRecord(msg.id, msg.date, msg.message),
+    )
+    return Backfiller(compass, MessageStore(str(tmp_path)), ranges=ranges, concurrency=concurrency)
+
+
+def stored_ids(tmp_path):
+    messages = asyncio.run(MessageStore(str(tmp_path)).load('test'))
+    return [msg.id for msg in messages]
+
+
+def expected_ids(low, high):
+    return [i for i in range(low + 1, high + 1) if i % 7 != 0]
+
+
+@pytest.mark.parametrize('low, high, ranges', [(0, 100, 8), (0, 3, 8), (40, 41, 4), (10, 1000, 7)])
+def test_split_covers_range_without_overlap(tmp_path, low, high, ranges):
+    backfiller = make_backfiller(tmp_path, FakeClient(1), ranges=ranges)
+    parts = backfiller._split(low, high)
+
+    assert len(parts) <= ranges
+    assert parts[0]['min_id'] == low
+    assert parts[-1]['max_id'] == high
+    for prev, cur in zip(parts, parts[1:]):
+        assert prev['max_id'] == cur['min_id']
+    for part in parts:
+        assert part['min_id'] < part['max_id']
+        assert part['cursor'] == part['max_id'] + 1
+        assert not part['done']
+
+
+def test_missing_returns_uncovered_parts():
+    assert Backfiller._missing(0, 100, 0, 100) == []
+    assert Backfiller._missing(0, 120, 0, 100) == [(100, 120)]
+    assert Backfiller._missing(0, 120, 50, 100) == [(0, 50), (100, 120)]
+    assert Backfiller._missing(200, 300, 0, 100) == [(200, 300)]
+
+
+def test_resume_after_interruption_fetches_every_message(tmp_path, monkeypatch):
+    monkeypatch.setattr(backfill, 'FLUSH_EVERY', 10)
+
+    client = FakeClient(200, fail_after=73)
+    with pytest.raises(Interrupted):
+        asyncio.run(make_backfiller(tmp_path, client).backfill('@test'))
+
+    # 保存的进度不能超过已写入存储的消息
+    with open(tmp_path / 'backfill' / 'test.json', encoding='utf-8') as f:
+        state = json.load(f)
+    stored = set(stored_ids(tmp_path))
+    for part in state['ranges']:
+        assert set(expected_ids(part['cursor'] - 1, part['max_id'])) <= stored
+
+    client.fail_after = None
+    asyncio.run(make_backfiller(tmp_path, client).backfill('@test'))
+
+    assert stored_ids(tmp_path) == expected_ids(0, 200)
+
+
+def test_completed_backfill_only_fetches_new_messages(tmp_path):
+    client = FakeClient(100)
+    assert asyncio.run(make_backfiller(tmp_path, client).backfill('@test')) == len(expected_ids(0, 100))
+
+    client.extend(130)
+    client.calls.clear()
+    count = asyncio.run(make_backfiller(tmp_path, client).backfill('@test'))
+
+    assert count == len(expected_ids(100, 130))
+    assert all(min_id >= 100 for min_id, _ in client.calls)
+    assert stored_ids(tmp_path) == expected_ids(0, 130)
+
+    # 没有新消息时不再获取
+    client.calls.clear()
+    assert asyncio.run(make_backfiller(tmp_path, client).backfill('@test')) == 0
+    assert client.calls == []
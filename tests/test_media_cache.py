@@ -0,0 +1,44 @@
+import os
+
+from media_cache import MediaCache
+
+
+def touch(path, size=0, mtime=None):
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_discard_temp_keeps_keys_with_same_prefix(tmp_path):
+    cache = MediaCache(str(tmp_path), 10 ** 6)
+    for name in ['.photo_12', '.photo_12.jpg', '.photo_123.jpg', '.photo_1234']:
+        touch(tmp_path / name)
+
+    cache.discard_temp('photo_12')
+
+    assert sorted(os.listdir(tmp_path)) == ['.photo_123.jpg', '.photo_1234']
+
+
+def test_commit_evicts_least_recently_used(tmp_path):
+    cache = MediaCache(str(tmp_path), 1000)
+    for i in range(4):
+        temp = cache.temp_path(f"photo_{i}") + '.jpg'
+        touch(temp, 300, mtime=1000 + i)
+        cache.commit(f"photo_{i}", temp)
+        os.utime(tmp_path / f"photo_{i}.jpg", (1000 + i, 1000 + i))
+
+    assert sorted(os.listdir(tmp_path)) == ['photo_1.jpg', 'photo_2.jpg', 'photo_3.jpg']
+    assert cache.total_bytes == 900
+    assert cache.lookup('photo_0') is None
+
+
+def test_startup_removes_only_stale_temp_files(tmp_path):
+    touch(tmp_path / '.photo_1.jpg', mtime=0)
+    touch(tmp_path / '.document_2')
+    touch(tmp_path / 'photo_3.jpg', 10)
+
+    cache = MediaCache(str(tmp_path), 1000)
+
+    assert sorted(os.listdir(tmp_path)) == ['.document_2', 'photo_3.jpg']
+    assert cache.total_bytes == 10
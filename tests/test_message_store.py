@@ -0,0 +1,31 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from message_record import MessageRecord
+from message_store import MessageStore
+
+
+def records(ids):
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [MessageRecord(i, base + timedelta(minutes=i), f"消息 {i} " + 'x' * 50) for i in ids]
+
+
+def test_load_recent_reads_tail_across_blocks(tmp_path):
+    store = MessageStore(str(tmp_path))
+    asyncio.run(store.append('test', records(range(1, 501))))
+
+    recent = asyncio.run(store.load_recent('test', 120, block_size=256))
+
+    assert [msg.id for msg in recent] == list(range(381, 501))
+    assert recent[-1].text == asyncio.run(store.load('test'))[-1].text
+
+
+def test_load_recent_skips_duplicates_and_short_history(tmp_path):
+    store = MessageStore(str(tmp_path))
+    asyncio.run(store.append('test', records(range(1, 11))))
+    # 回填会以任意顺序追加，并可能重复写入同一批消息
+    asyncio.run(store.append('test', records(range(6, 11))))
+
+    assert [msg.id for msg in asyncio.run(store.load_recent('test', 7, block_size=64))] == list(range(4, 11))
+    assert len(asyncio.run(store.load_recent('test', 100))) == 10
+    assert asyncio.run(store.load_recent('missing', 10)) == []
@@ -0,0 +1,87 @@
+import random
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from message_record import MessageRecord
+from topic_cluster import cluster_messages, merge_similar, spherical_kmeans, vectorize
+
+TOPICS = {
+    'crypto': ['比特币价格', '以太坊升级', '交易所', '矿工收益', '链上数据'],
+    'election': ['总统选举', '投票率', '候选人辩论', '民调结果', '选区'],
+    'weather': ['台风登陆', '暴雨预警', '气温骤降', '降雪', '空气质量'],
+    'football': ['欧冠决赛', '进球', '转会窗口', '主教练', '点球大战'],
+}
+
+
+def make_messages(per_topic=60, seed=0):
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    messages, topics = [], []
+    for topic, phrases in TOPICS.items():
+        for _ in range(per_topic):
+            text = '，'.join(rng.choice(phrases) for _ in range(6))
+            messages.append(MessageRecord(len(messages) + 1, base + timedelta(minutes=len(messages)), text))
+            topics.append(topic)
+    return messages, topics
+
+
+def test_vectorize_shape_and_normalization():
+    matrix, terms = vectorize(['比特币价格上涨', '比特币价格下跌', 'hello world', ''])
+
+    assert matrix.shape == (4, len(terms))
+    assert '比特币' in terms and 'hel' in terms
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    assert np.allclose(norms, [1, 1, 1, 0])
+
+
+def test_vectorize_limits_features():
+    matrix, terms = vectorize(['abcdefgh ijklmnop'] * 3 + ['qrstuvwx'], max_features=5)
+
+    assert matrix.shape == (4, 5)
+    assert len(set(terms)) == 5
+
+
+def test_spherical_kmeans_and_merge_separate_topics():
+    messages, topics = make_messages(per_topic=20)
+    matrix, _ = vectorize([msg.text for msg in messages])
+    labels, scores, centroids = spherical_kmeans(matrix, 8)
+
+    assert labels.shape == scores.shape == (len(messages),)
+    assert centroids.shape == (8, matrix.shape[1])
+
+    merged, k = merge_similar(labels, centroids, 0.5)
+    assert k == len(set(merged)) == len(TOPICS)
+
+
+def test_cluster_messages_groups_synthetic_topics():
+    messages, topics = make_messages()
+    clusters = cluster_messages(messages, max_samples=5)
+
+    assert len(clusters) == len(TOPICS)
+    assert sum(cluster.size for cluster in clusters) == len(messages)
+    topic_of = {msg.id: topic for msg, topic in zip(messages, topics)}
+    for cluster in clusters:
+        assert cluster.size == 60
+        assert len(cluster.samples) == 5
+        assert len({topic_of[msg.id] for msg in cluster.samples}) == 1
+        assert [msg.date for msg in cluster.samples] == sorted(msg.date for msg in cluster.samples)
+
+
+def test_cluster_messages_memory_stays_bounded():
+    # 不应展开 消息数 × 特征数 的稠密数组 (此规模下约 2000 × 20000 × 8 字节 = 320 MB)，
+    # n-gram 按批提取，候选词表有上限
+    rng = random.Random(1)
+    chars = [chr(code) for code in range(0x4E00, 0x4E00 + 3000)]
+    messages = [
+        MessageRecord(i, datetime(2024, 1, 1, tzinfo=timezone.utc), ''.join(rng.choice(chars) for _ in range(200)))
+        for i in range(2000)
+    ]
+
+    tracemalloc.start()
+    cluster_messages(messages)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert peak < 64 * 1024 * 1024